@@ -3,40 +3,32 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-import json
-import os
 from datetime import datetime, timedelta
-import traceback
 import asyncio
+import logging
 import math
+import os
+import re
+import time
 
-LEDGER_FILE = "ledger.json"
-PENDING_FILE = "pending.json"
-REQUIRED_VOTES = 1  # Modulable ici
-MAX_FIELDS_PER_PAGE = 24  # Limite Discord
-PROPOSAL_TIMEOUT = 36000  # 5 minutes en secondes pour test (normalement 36000 pour 10h)
+from functools import partial
 
-def load_ledger():
-    if not os.path.exists(LEDGER_FILE):
-        with open(LEDGER_FILE, "w") as f:
-            json.dump({}, f)
-    with open(LEDGER_FILE, "r") as f:
-        return json.load(f)
+from models import LedgerEntry, Proposal
+from pagination import EmbedPacker, LazyPages, PaginatedView, Section
+from scheduler import ExpirationScheduler, RefreshLoop
+from user_cache import _unknown
 
-def save_ledger(data):
-    with open(LEDGER_FILE, "w") as f:
-        json.dump(data, f, indent=4)
+REQUIRED_VOTES = 1  # Modulable ici
+PROPOSAL_TIMEOUT = 36000  # 5 minutes en secondes pour test (normalement 36000 pour 10h)
+TIMER_REFRESH_INTERVAL = 60  # secondes entre deux tours de la boucle des comptes à rebours
+TIMER_EDIT_BUDGET = int(os.getenv("TIMER_EDIT_BUDGET", "30"))  # éditions REST max par tour
+REHYDRATE_CONCURRENCY = 10  # messages relus en parallèle au redémarrage
+MERGE_WINDOW = int(os.getenv("PROPOSAL_MERGE_WINDOW", "180"))  # secondes pendant lesquelles un doublon est fusionné (0 : jamais)
+GROUP_MAX_VICTIMS = 25  # victimes max d'une proposition de groupe (un field de carte)
 
-def load_pending():
-    if not os.path.exists(PENDING_FILE):
-        with open(PENDING_FILE, "w") as f:
-            json.dump({}, f)
-    with open(PENDING_FILE, "r") as f:
-        return json.load(f)
+MENTION_PATTERN = re.compile(r"<@!?(\d+)>")
 
-def save_pending(data):
-    with open(PENDING_FILE, "w") as f:
-        json.dump(data, f, indent=4)
+log = logging.getLogger(__name__)
 
 ICONS = {
     "Tournée": "🍺",
@@ -45,55 +37,89 @@ ICONS = {
     "Café": "☕"
 }
 
+def format_time_left(seconds, coarse=False):
+    """Temps restant arrondi à la minute supérieure ("2h 5min", "12min")
+
+    En mode `coarse`, au-delà d'une heure seules les heures sont affichées :
+    le texte de la carte ne change alors qu'une fois par heure.
+    """
+    total_minutes = math.ceil(seconds / 60)
+    hours_left = total_minutes // 60
+    minutes_left = total_minutes % 60
+    if coarse and hours_left > 0:
+        return f"environ {round(total_minutes / 60)}h"
+    return f"{hours_left}h\u00A0{minutes_left}min" if hours_left > 0 else f"{minutes_left}min"
+
+def vote_status_text(votes_count, expires_at):
+    """Texte du dernier field de la carte : votes + compte à rebours"""
+    time_str = format_time_left((expires_at - datetime.now()).total_seconds(), coarse=True)
+    return f"**{votes_count}/{REQUIRED_VOTES}** votes • Réagissez avec 👍\n⏰ Expire dans {time_str}"
+
+def build_proposal_embed(proposal_id, entry, state="pending"):
+    """Carte d'une proposition, construite uniquement depuis l'entrée pending
+
+    state : "pending" (en attente de votes), "validated" ou "expired".
+    Les mentions sont construites depuis les IDs, sans appel à l'API.
+    """
+    votes_count = len(entry.votes)
+    victims = entry.victims
+    if state == "validated":
+        embed = discord.Embed(
+            title="✅ Tournée Validée !",
+            description="Cette tournée a été ajoutée au grand livre"
+            + (f" de chacune des {len(victims)} victimes" if len(victims) > 1 else ""),
+            color=discord.Color.green()
+        )
+    elif state == "expired":
+        embed = discord.Embed(
+            title="❌ Tournée Annulée",
+            description="Cette proposition n'a pas reçu assez de votes dans le temps imparti",
+            color=discord.Color.red()
+        )
+    else:
+        embed = discord.Embed(
+            title="⏳ Proposition de Tournée",
+            description=f"Cette proposition nécessite **{REQUIRED_VOTES} 👍** pour être validée",
+            color=discord.Color.orange()
+        )
+    
+    emoji = ICONS.get(entry.item, "❓")
+    if len(victims) > 1:
+        embed.add_field(name=f"👥 Victimes ({len(victims)})", value=" ".join(f"<@{uid}>" for uid in victims), inline=False)
+    else:
+        embed.add_field(name="👤 Victime", value=f"<@{entry.user_id}>", inline=True)
+    embed.add_field(name=f"{emoji} Item", value=f"**{entry.item}** ×{entry.amount}", inline=True)
+    embed.add_field(name="📝 Proposé par", value=f"<@{entry.added_by}>", inline=True)
+    
+    if entry.reason:
+        embed.add_field(name="💬 Raison", value=f"*{entry.reason}*", inline=False)
+    
+    if state == "validated":
+        embed.set_footer(text=f"Validé avec {votes_count} votes")
+    elif state == "expired":
+        embed.set_footer(text=f"Expiré avec {votes_count}/{REQUIRED_VOTES} votes")
+    else:
+        embed.add_field(
+            name="━━━━━━━━━━━━━",
+            value=vote_status_text(votes_count, datetime.fromisoformat(entry.expires_at)),
+            inline=False
+        )
+        embed.set_footer(text=f"ID: {proposal_id}")
+    return embed
+
 # ============================================================
 # 🔵 PAGINATION VIEW (boutons)
 # ============================================================
-class PendingView(discord.ui.View):
-    def __init__(self, pages, user):
-        super().__init__(timeout=90)
-        self.pages = pages
-        self.page = 0
-        self.user = user
-        self.update_buttons()
-
-    def update_buttons(self):
-        """Active/désactive les boutons selon la page actuelle"""
-        self.children[0].disabled = (self.page == 0)  # Bouton précédent
-        self.children[1].disabled = (self.page >= len(self.pages) - 1)  # Bouton suivant
-
-    async def update_message(self, interaction):
-        self.update_buttons()
-        embed = self.pages[self.page]
-        embed.set_footer(text=f"Page {self.page + 1}/{len(self.pages)} • {len(self.pages[0].fields)} proposition(s) en attente")
-        await interaction.response.edit_message(embed=embed, view=self)
-
-    @discord.ui.button(label="◀️", style=discord.ButtonStyle.primary)
-    async def previous(self, interaction, button):
-        if interaction.user.id != self.user.id:
-            return await interaction.response.send_message(
-                "❌ Tu ne peux pas utiliser ces boutons.", ephemeral=True
-            )
-        if self.page > 0:
-            self.page -= 1
-        await self.update_message(interaction)
-
-    @discord.ui.button(label="▶️", style=discord.ButtonStyle.primary)
-    async def next(self, interaction, button):
-        if interaction.user.id != self.user.id:
-            return await interaction.response.send_message(
-                "❌ Tu ne peux pas utiliser ces boutons.", ephemeral=True
-            )
-        if self.page < len(self.pages) - 1:
-            self.page += 1
-        await self.update_message(interaction)
+class PendingView(PaginatedView):
+    def __init__(self, pages, user, pending_count):
+        super().__init__(pages, user)
+        self.pending_count = pending_count
 
-    @discord.ui.button(label="🗑️ Fermer", style=discord.ButtonStyle.danger)
-    async def close(self, interaction, button):
-        if interaction.user.id != self.user.id:
-            return await interaction.response.send_message(
-                "❌ Tu ne peux pas utiliser ces boutons.", ephemeral=True
-            )
-        await interaction.response.edit_message(content="Dashboard fermé.", embed=None, view=None)
+    def footer_text(self):
+        count_text = f"{self.pending_count} proposition(s) en attente"
+        if self.pages.total == 1:
+            return count_text
+        return f"{self.pages.page_label(self.page)} • {count_text}"
 
 
 class ReasonModal(discord.ui.Modal, title="Ajouter une raison"):
@@ -104,87 +130,71 @@ class ReasonModal(discord.ui.Modal, title="Ajouter une raison"):
         required=False
     )
 
-    def __init__(self, user, item, amount, original_view):
+    def __init__(self, user_ids, item, amount, original_view):
         super().__init__()
-        self.target_user = user
+        self.user_ids = user_ids
         self.item = item
         self.amount = amount
         self.original_view = original_view
 
     async def on_submit(self, interaction: discord.Interaction):
-        pending = load_pending()
+        store = await interaction.client.stores.get(interaction.guild_id)
+        cog = interaction.client.get_cog("AddCommand")
+        reason = self.reason.value if self.reason.value else None
+        
+        # Même victime, même item, proposé il y a peu : on complète la carte existante
+        if len(self.user_ids) == 1:
+            duplicate_id = store.find_proposal_for(self.user_ids[0], self.item)
+            if duplicate_id and await cog.merge_proposal(store, duplicate_id, interaction, self.amount, reason):
+                self.original_view.disable_button()
+                return
         
         # Créer une clé unique pour cette proposition
         proposal_id = f"{interaction.id}"
         
         # Calculer l'heure d'expiration
-        expires_at = (datetime.now() + timedelta(seconds=PROPOSAL_TIMEOUT)).isoformat()
-        
-        entry = {
-            "user_id": self.target_user.id,
-            "item": self.item,
-            "amount": self.amount,
-            "reason": self.reason.value if self.reason.value else None,
-            "added_by": interaction.user.id,
-            "timestamp": datetime.now().isoformat(),
-            "expires_at": expires_at,
-            "votes": [],
-            "message_id": None,
-            "channel_id": None
-        }
-        
-        pending[proposal_id] = entry
-        save_pending(pending)
-        
-        # Créer l'embed de proposition
-        emoji = ICONS.get(self.item, "❓")
-        embed = discord.Embed(
-            title="⏳ Proposition de Tournée",
-            description=f"Cette proposition nécessite **{REQUIRED_VOTES} 👍** pour être validée",
-            color=discord.Color.orange()
-        )
-        embed.add_field(name="👤 Victime", value=self.target_user.mention, inline=True)
-        embed.add_field(name=f"{emoji} Item", value=f"**{self.item}** ×{self.amount}", inline=True)
-        embed.add_field(name="📝 Proposé par", value=interaction.user.mention, inline=True)
-        
-        if self.reason.value:
-            embed.add_field(name="💬 Raison", value=f"*{self.reason.value}*", inline=False)
-        
-        # Calculer le temps restant initial avec arrondi
-        total_minutes = math.ceil(PROPOSAL_TIMEOUT / 60)
-        hours_left = total_minutes // 60
-        minutes_left = total_minutes % 60
-        time_str = f"{hours_left}h\u00A0{minutes_left}min" if hours_left > 0 else f"{minutes_left}min"
-        
-        embed.add_field(
-            name="━━━━━━━━━━━━━",
-            value=f"**0/{REQUIRED_VOTES}** votes • Réagissez avec 👍\n⏰ Expire dans {time_str}",
-            inline=False
+        expires_at = datetime.now() + timedelta(seconds=PROPOSAL_TIMEOUT)
+        
+        entry = Proposal.new(
+            self.user_ids[0],
+            self.item,
+            self.amount,
+            user_ids=self.user_ids if len(self.user_ids) > 1 else None,
+            reason=reason,
+            added_by=interaction.user.id,
+            timestamp=datetime.now().isoformat(),
+            expires_at=expires_at.isoformat(),
         )
-        embed.set_footer(text=f"ID: {proposal_id}")
         
-        # Désactiver le bouton "Proposer" dans le message original
-        self.original_view.disable_button()
-        
-        # Envoyer le message et ajouter la réaction
-        await interaction.response.send_message(embed=embed)
-        message = await interaction.original_response()
-        await message.add_reaction("👍")
-        
-        # Sauvegarder l'ID du message et du canal
-        pending[proposal_id]["message_id"] = message.id
-        pending[proposal_id]["channel_id"] = message.channel.id
-        save_pending(pending)
-        
-        # Lancer le timer d'expiration et les mises à jour
-        bot = interaction.client
-        asyncio.create_task(bot.get_cog("AddCommand").check_proposal_expiration(proposal_id))
-        asyncio.create_task(bot.get_cog("AddCommand").update_proposal_timer(proposal_id))
+        # Les votes arrivés avant la fin de l'envoi attendent que la carte soit inscrite
+        async with interaction.client.proposal_locks(proposal_id):
+            store.add_proposal(proposal_id, entry)
+            
+            # Créer l'embed de proposition
+            embed = build_proposal_embed(proposal_id, entry)
+            status_text = embed.fields[-1].value
+            
+            # Désactiver le bouton "Proposer" dans le message original
+            self.original_view.disable_button()
+            
+            # Envoyer le message
+            response = await interaction.response.send_message(embed=embed)
+            message = response.resource
+            
+            # Sauvegarder l'ID du message et du canal avant la réaction du bot :
+            # un 👍 posé entre-temps est ainsi rattaché à la proposition
+            store.update_proposal(proposal_id, message_id=message.id, channel_id=message.channel.id)
+            await message.add_reaction("👍")
+            
+            # Inscrire l'expiration et le compte à rebours affiché
+            key = (interaction.guild_id, proposal_id)
+            cog.expirations.schedule(key, expires_at)
+            cog.countdowns.mark_displayed(key, status_text)
 
 class AddView(discord.ui.View):
-    def __init__(self, user):
+    def __init__(self, user_ids):
         super().__init__(timeout=120)
-        self.target_user = user
+        self.user_ids = user_ids
         self.selected_item = None
         self.selected_amount = None
         self.button_used = False
@@ -227,7 +237,7 @@ class AddView(discord.ui.View):
         self.button_used = True
         
         await interaction.response.send_modal(
-            ReasonModal(self.target_user, self.selected_item, self.selected_amount, self)
+            ReasonModal(self.user_ids, self.selected_item, self.selected_amount, self)
         )
     
     def disable_button(self):
@@ -239,11 +249,28 @@ class AddView(discord.ui.View):
 class AddCommand(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.expirations = ExpirationScheduler(self.expire_proposals)
+        self.countdowns = RefreshLoop(
+            self.countdown_texts,
+            self.refresh_countdown,
+            interval=TIMER_REFRESH_INTERVAL,
+            budget=TIMER_EDIT_BUDGET,
+        )
+        self.rehydrated = False
+
+    async def cog_load(self):
+        self.expirations.start()
+        self.countdowns.start()
+
+    async def cog_unload(self):
+        await self.expirations.stop()
+        await self.countdowns.stop()
 
     @app_commands.command(name="add", description="Proposer une tournée pour quelqu'un")
+    @app_commands.guild_only()
     @app_commands.describe(user="La personne qui doit la tournée")
     async def add(self, interaction: discord.Interaction, user: discord.User):
-        view = AddView(user)
+        view = AddView([user.id])
         
         embed = discord.Embed(
             title="➕ Nouvelle Proposition",
@@ -253,203 +280,346 @@ class AddCommand(commands.Cog):
         
         await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
 
-    async def check_proposal_expiration(self, proposal_id):
-        """Vérifie si une proposition a expiré après le timeout"""
-        await asyncio.sleep(PROPOSAL_TIMEOUT)
-        
-        pending = load_pending()
+    @app_commands.command(name="addgroup", description="Proposer une même tournée pour tout un groupe (une seule carte, un seul vote)")
+    @app_commands.guild_only()
+    @app_commands.describe(
+        membres="Les personnes qui doivent la tournée, ex : @Alice @Bob @Chloé",
+        role="Ou tout un rôle (les bots sont ignorés)"
+    )
+    async def addgroup(self, interaction: discord.Interaction, membres: str = None, role: discord.Role = None):
+        user_ids = [int(uid) for uid in MENTION_PATTERN.findall(membres or "")]
+        if role is not None:
+            user_ids += [member.id for member in role.members if not member.bot]
+        user_ids = list(dict.fromkeys(user_ids))  # sans doublons, dans l'ordre donné
         
-        # Vérifier si la proposition existe encore
-        if proposal_id not in pending:
-            return
+        if not user_ids:
+            return await interaction.response.send_message(
+                "⚠️ Mentionne **au moins une personne** ou un rôle !",
+                ephemeral=True
+            )
+        if len(user_ids) > GROUP_MAX_VICTIMS:
+            return await interaction.response.send_message(
+                f"⚠️ {len(user_ids)} personnes : une proposition de groupe est limitée à **{GROUP_MAX_VICTIMS}** victimes.",
+                ephemeral=True
+            )
         
-        entry = pending[proposal_id]
-        votes_count = len(entry["votes"])
+        view = AddView(user_ids)
+        mentions = " ".join(f"<@{uid}>" for uid in user_ids)
+        embed = discord.Embed(
+            title="➕ Nouvelle Proposition de Groupe",
+            description=f"Proposer la même tournée pour **{len(user_ids)} personne(s)** :\n{mentions}\n\n"
+                        "Chacune la devra une fois la proposition validée. Choisis l'item et la quantité :",
+            color=discord.Color.blurple()
+        )
         
-        # Si le nombre de votes requis n'est pas atteint
-        if votes_count < REQUIRED_VOTES:
-            # Récupérer le message
-            try:
-                channel = self.bot.get_channel(entry["channel_id"])
-                message = await channel.fetch_message(entry["message_id"])
-                
-                # Créer l'embed d'annulation
-                emoji = ICONS.get(entry["item"], "❓")
-                embed = discord.Embed(
-                    title="❌ Tournée Annulée",
-                    description="Cette proposition n'a pas reçu assez de votes dans le temps imparti",
-                    color=discord.Color.red()
-                )
-                
-                user = await self.bot.fetch_user(entry["user_id"])
-                added_by = await self.bot.fetch_user(entry["added_by"])
-                
-                embed.add_field(name="👤 Victime", value=user.mention, inline=True)
-                embed.add_field(name=f"{emoji} Item", value=f"**{entry['item']}** ×{entry['amount']}", inline=True)
-                embed.add_field(name="📝 Proposé par", value=added_by.mention, inline=True)
-                
-                if entry["reason"]:
-                    embed.add_field(name="💬 Raison", value=f"*{entry['reason']}*", inline=False)
-                
-                embed.set_footer(text=f"Expiré avec {votes_count}/{REQUIRED_VOTES} votes")
-                
-                await message.edit(embed=embed)
-                await message.clear_reactions()
-                
-            except Exception as e:
-                print(f"[ERROR] Could not update expired proposal: {e}")
-            
-            # Supprimer de pending
-            del pending[proposal_id]
-            save_pending(pending)
-
-    async def update_proposal_timer(self, proposal_id):
-        """Met à jour le temps restant toutes les minutes"""
-        while True:
-            await asyncio.sleep(60)  # update toutes les 60s
-
-            pending = load_pending()
-            if proposal_id not in pending:
-                return  # proposition supprimée / validée
-
-            entry = pending[proposal_id]
-
-            expires_at = datetime.fromisoformat(entry["expires_at"])
-            remaining = expires_at - datetime.now()
-
-            if remaining.total_seconds() <= 0:
-                return  # expiration gérée ailleurs
-
-            # Arrondir à la minute supérieure
-            total_minutes = math.ceil(remaining.total_seconds() / 60)
-            hours_left = total_minutes // 60
-            minutes_left = total_minutes % 60
-            time_str = f"{hours_left}h\u00A0{minutes_left}min" if hours_left > 0 else f"{minutes_left}min"
-
-            try:
-                channel = self.bot.get_channel(entry["channel_id"])
-                message = await channel.fetch_message(entry["message_id"])
-
-                embed = message.embeds[0]
-                votes_count = len(entry["votes"])
-
-                # Mettre à jour le field avec le timer
-                embed.set_field_at(
-                    -1,
-                    name="━━━━━━━━━━━━━",
-                    value=f"**{votes_count}/{REQUIRED_VOTES}** votes • Réagissez avec 👍\n⏰ Expire dans {time_str}",
-                    inline=False
-                )
+        await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
 
-                await message.edit(embed=embed)
+    async def expire_proposals(self, keys):
+        """Traite en un seul lot les propositions arrivées à échéance, clés (guild_id, proposal_id)"""
 
-            except Exception as e:
-                print(f"[ERROR] Could not update timer: {e}")
-                return  # message supprimé ou erreur → on stop
+        async def expire(guild_id, proposal_id):
+            store = await self.bot.stores.get(guild_id)
+            # Sous le verrou de la proposition : aucun vote en cours ne peut
+            # réafficher la carte en attente après l'annulation
+            async with self.bot.proposal_locks(proposal_id):
+                # Vérifier si la proposition existe encore et n'a pas atteint les votes requis
+                entry = store.get_proposal(proposal_id)
+                if entry is None or len(entry.votes) >= REQUIRED_VOTES:
+                    return
+                store.remove_proposal(proposal_id, "expired")
+                await self.show_expired(proposal_id, entry)
+        
+        # Un verrou par proposition : les messages sont mis à jour en parallèle
+        await asyncio.gather(*(expire(*key) for key in keys))
 
     @commands.Cog.listener()
-    async def on_raw_reaction_add(self, payload):
-        if payload.user_id == self.bot.user.id:
+    async def on_ready(self):
+        # on_ready est rappelé à chaque reconnexion : on ne réhydrate qu'une fois
+        if self.rehydrated:
             return
-        
-        if str(payload.emoji) != "👍":
+        self.rehydrated = True
+        try:
+            await self.rehydrate()
+        except Exception:
+            log.exception("Rehydration failed")
+
+    async def rehydrate(self):
+        """Reprend les propositions restées dans pending après un redémarrage
+
+        Seul pending est lu pour chaque serveur ayant des données ; ceux qui
+        ont des propositions en attente sont ouverts (leurs votes passent
+        par un store chargé), les autres attendent leur première commande.
+        """
+        start = time.perf_counter()
+        now = datetime.now()
+        overdue = []
+        open_proposals = []
+        for guild_id in self.bot.stores.known_guilds():
+            pending = await self.bot.stores.read_pending(guild_id)
+            if not pending:
+                continue
+            await self.bot.stores.get(guild_id)
+            for proposal_id, entry in pending:
+                key = (guild_id, proposal_id)
+                expires_at = datetime.fromisoformat(entry.expires_at)
+                if expires_at <= now:
+                    overdue.append(key)
+                else:
+                    self.expirations.schedule(key, expires_at)
+                    open_proposals.append(key)
+        
+        # 1️⃣ Expirer d'un coup tout ce qui a dépassé l'échéance pendant l'arrêt
+        await self.expire_proposals(overdue)
+        
+        # 2️⃣ Recompter les 👍 ajoutés pendant l'arrêt, avec une concurrence bornée
+        semaphore = asyncio.Semaphore(REHYDRATE_CONCURRENCY)
+        
+        async def reconcile(key):
+            async with semaphore:
+                await self.reconcile_votes(*key)
+        
+        await asyncio.gather(*(reconcile(key) for key in open_proposals))
+        
+        # Les comptes à rebours figés seront remis à jour par la boucle de rafraîchissement
+        log.info(
+            "Rehydrated %d open and %d overdue proposal(s) in %.2fs",
+            len(open_proposals), len(overdue), time.perf_counter() - start,
+        )
+
+    async def reconcile_votes(self, guild_id, proposal_id):
+        """Relit les réactions 👍 d'une carte et ajoute les votes manquants"""
+        store = await self.bot.stores.get(guild_id)
+        entry = store.get_proposal(proposal_id)
+        if entry is None or not entry.message_id:
+            return
+        try:
+            message = await self.proposal_message(entry).fetch()
+        except discord.NotFound:
+            # Carte supprimée pendant l'arrêt : plus personne ne peut voter
+            log.warning("Proposal %s message is gone, dropping it", proposal_id)
+            store.remove_proposal(proposal_id, "expired")
+            self.expirations.cancel((guild_id, proposal_id))
+            return
+        except Exception as e:
+            log.error("Could not reconcile votes for %s: %s", proposal_id, e)
             return
         
-        pending = load_pending()
+        voters = []
+        for reaction in message.reactions:
+            if str(reaction.emoji) != "👍":
+                continue
+            # Pas plus de 👍 (hors celui du bot) que de votes connus : rien à relire
+            if reaction.count - (1 if reaction.me else 0) <= len(entry.votes):
+                continue
+            async for user in reaction.users():
+                if user.id != self.bot.user.id:
+                    voters.append(user.id)
+        
+        async with self.bot.proposal_locks(proposal_id):
+            # La proposition a pu être validée par un vote pendant la lecture
+            if store.get_proposal(proposal_id) is None:
+                return
+            for user_id in voters:
+                store.add_vote(proposal_id, user_id)
+            
+            entry = store.get_proposal(proposal_id)
+            if len(entry.votes) >= REQUIRED_VOTES:
+                await self.validate_proposal(guild_id, proposal_id, entry)
+
+    async def validate_proposal(self, guild_id, proposal_id, entry):
+        """Ajoute la tournée au grand livre et affiche la carte validée
+
+        À appeler en tenant le verrou de la proposition. Une proposition de
+        groupe donne une entrée par victime, écrites en une seule mutation.
+        """
+        store = self.bot.stores.get_loaded(guild_id)
+        victims = entry.victims
+        async with self.bot.ledger_locks.many((guild_id, uid) for uid in victims):
+            if len(victims) > 1:
+                store.add_entries([
+                    (uid, LedgerEntry.new(entry.item, entry.amount, entry.reason, entry.added_by))
+                    for uid in victims
+                ])
+            else:
+                store.add_entry(entry.user_id, LedgerEntry.new(entry.item, entry.amount, entry.reason, entry.added_by))
+        
+        # Supprimer de pending et de l'échéancier
+        store.remove_proposal(proposal_id, "validated")
+        self.expirations.cancel((guild_id, proposal_id))
+        
+        # Mettre à jour l'embed
+        message = self.proposal_message(entry)
+        await message.edit(embed=build_proposal_embed(proposal_id, entry, "validated"))
+        await message.clear_reactions()
+
+    async def merge_proposal(self, store, proposal_id, interaction, amount, reason):
+        """Ajoute un doublon (même victime, même item) à une proposition ouverte
+
+        Les quantités s'additionnent, la raison est ajoutée à la suite, les
+        votes déjà reçus et l'échéance sont conservés. Retourne False si la
+        carte n'accepte pas la fusion (traitée, pas encore envoyée ou plus
+        ancienne que MERGE_WINDOW) : une nouvelle carte est alors créée.
+        """
+        async with self.bot.proposal_locks(proposal_id):
+            entry = store.get_proposal(proposal_id)
+            if entry is None or not entry.message_id or not entry.timestamp:
+                return False
+            if datetime.now() - datetime.fromisoformat(entry.timestamp) > timedelta(seconds=MERGE_WINDOW):
+                return False
+            
+            changes = {"amount": entry.amount + amount}
+            if reason:
+                changes["reason"] = f"{entry.reason} / {reason}" if entry.reason else reason
+            store.update_proposal(proposal_id, **changes)
+            entry = store.get_proposal(proposal_id)
+        
+        # Réponse avant l'édition de la carte : un edit retardé (rate limit)
+        # ne doit pas faire dépasser les 3 s accordées à l'interaction
+        await interaction.response.send_message(
+            f"🔁 Une proposition identique était déjà ouverte : ta tournée y a été ajoutée "
+            f"(**{entry.item}** ×{entry.amount} pour <@{entry.user_id}>). Vote sur la carte existante avec 👍 !",
+            ephemeral=True
+        )
         
-        # Trouver la proposition correspondant au message
-        proposal_id = None
-        for pid, data in pending.items():
-            if data.get("message_id") == payload.message_id:
-                proposal_id = pid
-                break
+        async with self.bot.proposal_locks(proposal_id):
+            entry = store.get_proposal(proposal_id)
+            if entry is None:
+                return True  # validée ou expirée entre-temps : sa carte finale est déjà affichée
+            embed = build_proposal_embed(proposal_id, entry)
+            await self.proposal_message(entry).edit(embed=embed)
+            self.countdowns.mark_displayed((interaction.guild_id, proposal_id), embed.fields[-1].value)
+        return True
+
+    def proposal_message(self, entry):
+        """Référence partielle vers la carte d'une proposition (aucun appel REST)"""
+        channel = self.bot.get_partial_messageable(entry.channel_id)
+        return channel.get_partial_message(entry.message_id)
+
+    async def show_expired(self, proposal_id, entry):
+        """Remplace la carte d'une proposition expirée par l'embed d'annulation"""
+        try:
+            message = self.proposal_message(entry)
+            await message.edit(embed=build_proposal_embed(proposal_id, entry, "expired"))
+            await message.clear_reactions()
+        except Exception as e:
+            log.error("Could not update expired proposal %s: %s", proposal_id, e)
+
+    def countdown_texts(self):
+        """Texte attendu du compte à rebours de chaque proposition ouverte, par clé (guild_id, proposal_id)"""
+        for guild_id, store in list(self.bot.stores.loaded()):
+            for proposal_id, entry in store.pending_items():
+                if not entry.message_id:
+                    continue  # message pas encore envoyé
+                expires_at = datetime.fromisoformat(entry.expires_at)
+                if expires_at <= datetime.now():
+                    continue  # expiration gérée par l'échéancier
+                yield (guild_id, proposal_id), vote_status_text(len(entry.votes), expires_at)
+
+    async def refresh_countdown(self, key):
+        """Met à jour le field du compte à rebours d'une proposition, retourne le texte envoyé"""
+        guild_id, proposal_id = key
+        async with self.bot.proposal_locks(proposal_id):
+            entry = self.bot.stores.get_loaded(guild_id).get_proposal(proposal_id)
+            if entry is None:
+                return None  # proposition supprimée / validée entre-temps
+
+            # Réafficher la carte avec le timer à jour
+            embed = build_proposal_embed(proposal_id, entry)
+            await self.proposal_message(entry).edit(embed=embed)
+            return embed.fields[-1].value
+
+    @commands.Cog.listener()
+    async def on_raw_reaction_add(self, payload):
+        # Serveur pas encore ouvert (ou message privé) : aucune proposition à y chercher
+        store = self.bot.stores.get_loaded(payload.guild_id)
+        if store is None:
+            return
         
+        # Trouver la proposition correspondant au message (index mémoire :
+        # les réactions hors propositions sont rejetées sans aucune I/O)
+        proposal_id = store.find_proposal_by_message(payload.message_id)
         if not proposal_id:
             return
         
-        entry = pending[proposal_id]
-        
-        # Vérifier que l'utilisateur n'a pas déjà voté
-        if payload.user_id in entry["votes"]:
+        if payload.user_id == self.bot.user.id:
             return
         
-        # Ajouter le vote
-        entry["votes"].append(payload.user_id)
-        save_pending(pending)
-        
-        # Mettre à jour le message
-        channel = self.bot.get_channel(payload.channel_id)
-        message = await channel.fetch_message(payload.message_id)
-        
-        votes_count = len(entry["votes"])
-        emoji = ICONS.get(entry["item"], "❓")
+        if str(payload.emoji) != "👍":
+            return
         
-        if votes_count >= REQUIRED_VOTES:
-            # Valider la tournée
-            ledger = load_ledger()
-            uid = str(entry["user_id"])
-            
-            if uid not in ledger:
-                ledger[uid] = []
+        # Un vote à la fois par proposition : chaque édition de la carte part
+        # de l'état laissé par la précédente, et aucune ne passe après la validation
+        async with self.bot.proposal_locks(proposal_id):
+            # Validée ou expirée pendant l'attente du verrou
+            if store.get_proposal(proposal_id) is None:
+                return
             
-            ledger[uid].append({
-                "item": entry["item"],
-                "amount": entry["amount"],
-                "reason": entry["reason"],
-                "added_by": entry["added_by"]
-            })
-            save_ledger(ledger)
+            # Ajouter le vote (ignoré si l'utilisateur a déjà voté)
+            if not store.add_vote(proposal_id, payload.user_id):
+                return
             
-            # Supprimer de pending
-            del pending[proposal_id]
-            save_pending(pending)
+            entry = store.get_proposal(proposal_id)
+            votes_count = len(entry.votes)
             
-            # Mettre à jour l'embed
-            embed = discord.Embed(
-                title="✅ Tournée Validée !",
-                description="Cette tournée a été ajoutée au grand livre",
-                color=discord.Color.green()
-            )
-            user = await self.bot.fetch_user(entry["user_id"])
-            added_by = await self.bot.fetch_user(entry["added_by"])
-            
-            embed.add_field(name="👤 Victime", value=user.mention, inline=True)
-            embed.add_field(name=f"{emoji} Item", value=f"**{entry['item']}** ×{entry['amount']}", inline=True)
-            embed.add_field(name="📝 Proposé par", value=added_by.mention, inline=True)
-            
-            if entry["reason"]:
-                embed.add_field(name="💬 Raison", value=f"*{entry['reason']}*", inline=False)
-            
-            embed.set_footer(text=f"Validé avec {votes_count} votes")
-            
-            await message.edit(embed=embed)
-            await message.clear_reactions()
-        else:
-            # Calculer le temps restant avec arrondi à la minute supérieure
-            expires_at = datetime.fromisoformat(entry["expires_at"])
-            time_left = expires_at - datetime.now()
-            total_minutes = math.ceil(time_left.total_seconds() / 60)
-            hours_left = total_minutes // 60
-            minutes_left = total_minutes % 60
-            time_str = f"{hours_left}h\u00A0{minutes_left}min" if hours_left > 0 else f"{minutes_left}min"
-            
-            # Mettre à jour le compte de votes
-            embed = message.embeds[0]
-            embed.set_field_at(
-                -1,
-                name="━━━━━━━━━━━━━",
-                value=f"**{votes_count}/{REQUIRED_VOTES}** votes • Réagissez avec 👍\n⏰ Expire dans {time_str}",
-                inline=False
-            )
-            await message.edit(embed=embed)
+            if votes_count >= REQUIRED_VOTES:
+                # Valider la tournée
+                await self.validate_proposal(payload.guild_id, proposal_id, entry)
+            else:
+                # Mettre à jour le compte de votes (référence partielle, sans fetch)
+                embed = build_proposal_embed(proposal_id, entry)
+                await self.proposal_message(entry).edit(embed=embed)
+                self.countdowns.mark_displayed((payload.guild_id, proposal_id), embed.fields[-1].value)
+
+    def pending_embed(self):
+        return discord.Embed(
+            title="⏳ Propositions en Attente",
+            description=f"*Nécessitent {REQUIRED_VOTES} votes pour être validées*",
+            color=discord.Color.orange()
+        )
+
+    def pending_section(self, store, guild, proposal_ids, index):
+        """Une proposition = un field, None si elle a été traitée entre-temps"""
+        entry = store.get_proposal(proposal_ids[index])
+        if entry is None:
+            return None
+        
+        user = self.bot.resolver.lookup(entry.user_id, guild) or _unknown(entry.user_id)
+        added_by = self.bot.resolver.lookup(entry.added_by, guild) or _unknown(entry.added_by)
+        emoji = ICONS.get(entry.item, "❓")
+        votes_count = len(entry.votes)
+        
+        # Calculer le temps restant avec arrondi à la minute supérieure
+        expires_at = datetime.fromisoformat(entry.expires_at)
+        time_str = format_time_left((expires_at - datetime.now()).total_seconds())
+        
+        others = len(entry.victims) - 1
+        field_name = f"{emoji} {entry.item} ×{entry.amount} pour {user.display_name}"
+        if others:
+            field_name += f" et {others} autre(s)"
+        field_value = f"**Votes :** {votes_count}/{REQUIRED_VOTES} \u2009• \u2009⏰ {time_str}\n**Par :** {added_by.mention}"
+        
+        if entry.reason:
+            field_value += f"\n**Raison :** *{entry.reason}*"
+        log.debug("Proposition %s: %d chars", proposal_ids[index], len(field_name) + len(field_value))
+        return Section(None, [(field_name, field_value, False)])
+
+    def fill_pending_page(self, packer, cursor):
+        embed, end = packer.fill_page(cursor)
+        if not embed.fields:
+            # Validées ou expirées depuis l'ouverture du dashboard
+            embed.add_field(name="⠀", value="*Ces propositions ont été traitées entre-temps.*", inline=False)
+        return embed, end
 
     @app_commands.command(name="dashboardpending", description="Affiche les propositions en attente de validation")
+    @app_commands.guild_only()
     async def dashboardpending(self, interaction: discord.Interaction):
         try:
-            print("[DEBUG] Dashboardpending command called")
-            pending = load_pending()
+            log.debug("Dashboardpending command called by %s", interaction.user)
+            store = await self.bot.stores.get(interaction.guild_id)
+            # Seuls les IDs sont copiés : chaque page relit le store à l'affichage
+            proposal_ids = [proposal_id for proposal_id, _ in store.pending_items()]
             
-            if not pending:
+            if not proposal_ids:
                 embed = discord.Embed(
                     title="📭 Aucune proposition",
                     description="Il n'y a pas de tournée en attente de validation",
@@ -459,88 +629,41 @@ class AddCommand(commands.Cog):
             
             await interaction.response.defer()
             
-            # Créer les pages avec pagination
-            PAGE_CHAR_LIMIT = 5800
-            pages = []
-            current_embed = discord.Embed(
-                title="⏳ Propositions en Attente",
-                description=f"*Nécessitent {REQUIRED_VOTES} votes pour être validées*",
-                color=discord.Color.orange()
-            )
-            base_size = len(current_embed.title or "") + len(current_embed.description or "")
-            current_page_size = base_size
-            
-            print(f"[DEBUG] {len(pending)} propositions to display")
+            log.debug("%d propositions to display", len(proposal_ids))
             
-            pending_count = 0
-            for proposal_id, entry in pending.items():
-                pending_count += 1
-                
-                user = await self.bot.fetch_user(entry["user_id"])
-                added_by = await self.bot.fetch_user(entry["added_by"])
-                emoji = ICONS.get(entry["item"], "❓")
-                votes_count = len(entry["votes"])
-                
-                # Calculer le temps restant avec arrondi à la minute supérieure
-                expires_at = datetime.fromisoformat(entry["expires_at"])
-                time_left = expires_at - datetime.now()
-                total_minutes = math.ceil(time_left.total_seconds() / 60)
-                hours_left = total_minutes // 60
-                minutes_left = total_minutes % 60
-                time_str = f"{hours_left}h\u00A0{minutes_left}min" if hours_left > 0 else f"{minutes_left}min"
-                
-                field_name = f"{emoji} {entry['item']} ×{entry['amount']} pour {user.display_name}"
-                field_value = f"**Votes :** {votes_count}/{REQUIRED_VOTES} \u2009• \u2009⏰ {time_str}\n**Par :** {added_by.mention}"
-                
-                if entry["reason"]:
-                    field_value += f"\n**Raison :** *{entry['reason']}*"
-                
-                # Calculer la taille de ce field
-                field_size = len(field_name) + len(field_value)
-                
-                print(f"[DEBUG] Proposition {pending_count}: {field_size} chars, current page: {current_page_size} chars, {len(current_embed.fields)} fields")
-                
-                # Vérifier les limites (fields ET caractères)
-                will_exceed_fields = (len(current_embed.fields) >= MAX_FIELDS_PER_PAGE)
-                will_exceed_chars = (current_page_size + field_size > PAGE_CHAR_LIMIT)
-                
-                if (will_exceed_fields or will_exceed_chars) and len(current_embed.fields) > 0:
-                    print(f"[DEBUG] Pending page full (fields: {will_exceed_fields}, chars: {will_exceed_chars}), creating new page")
-                    pages.append(current_embed)
-                    current_embed = discord.Embed(
-                        title="⏳ Propositions en Attente",
-                        description=f"*Nécessitent {REQUIRED_VOTES} votes pour être validées*",
-                        color=discord.Color.orange()
-                    )
-                    current_page_size = base_size
-                
-                current_embed.add_field(name=field_name, value=field_value, inline=False)
-                current_page_size += field_size
+            # Résoudre d'abord tous les utilisateurs distincts, en parallèle :
+            # les pages lisent ensuite les noms dans le cache du resolver
+            user_ids = [
+                uid for _, entry in store.pending_items()
+                for uid in (entry.user_id, entry.added_by)
+            ]
+            await self.bot.resolver.prefetch(user_ids, interaction.guild)
             
-            # Ajouter la dernière page
-            if len(current_embed.fields) > 0:
-                pages.append(current_embed)
+            packer = EmbedPacker(
+                self.pending_embed,
+                partial(self.pending_section, store, interaction.guild, proposal_ids),
+                len(proposal_ids),
+            )
+            pages = LazyPages(partial(self.fill_pending_page, packer))
+            view = PendingView(pages, interaction.user, len(proposal_ids))
+            embed = view.render()
             
-            print(f"[DEBUG] Created {len(pages)} pending pages")
+            log.debug("First pending page built, user cache: %s", self.bot.resolver.stats())
             
             # Envoyer avec ou sans pagination
-            if len(pages) == 1:
-                pages[0].set_footer(text=f"{len(pending)} proposition(s) en attente")
-                await interaction.followup.send(embed=pages[0])
+            if pages.total == 1:
+                await interaction.followup.send(embed=embed)
             else:
-                view = PendingView(pages, interaction.user)
-                pages[0].set_footer(text=f"Page 1/{len(pages)} • {len(pending)} proposition(s) en attente")
-                await interaction.followup.send(embed=pages[0], view=view)
+                await interaction.followup.send(embed=embed, view=view)
             
-            print("[DEBUG] Dashboardpending sent successfully")
+            log.debug("Dashboardpending sent successfully")
         
         except Exception as e:
-            print(f"[ERROR] Dashboardpending failed: {e}")
-            traceback.print_exc()
+            log.exception("Dashboardpending failed")
             try:
                 await interaction.followup.send(f"❌ Erreur: {str(e)}", ephemeral=True)
             except:
-                print("[ERROR] Could not send error message")
+                log.error("Could not send error message")
 
 async def setup(bot):
     await bot.add_cog(AddCommand(bot))
\ No newline at end of file
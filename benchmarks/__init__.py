@@ -0,0 +1,4 @@
+# benchmarks/
+#
+# Mesures hors ligne du bot contre un faux client Discord (fake_discord).
+# Suite complète : python -m benchmarks --help
@@ -0,0 +1,59 @@
+# benchmarks/__main__.py
+#
+# Suite de benchmarks hors ligne.
+#
+# Usage : python -m benchmarks [scénario ...] [--backend json|journal|sqlite]
+#                              [--latency 0.05] [--output benchmark_results.json]
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+from datetime import datetime
+
+from benchmarks.harness import BACKENDS, run_scenario
+from benchmarks.scenarios import SCENARIOS
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmarks hors ligne du bot")
+    parser.add_argument("scenarios", nargs="*", help=f"scénarios à lancer parmi {', '.join(SCENARIOS)} (tous par défaut)")
+    parser.add_argument("--backend", choices=BACKENDS, default="json", help="store utilisé")
+    parser.add_argument("--latency", type=float, default=0.0, help="latence injectée par appel REST (secondes)")
+    parser.add_argument("--output", default="benchmark_results.json", help="fichier JSON des résultats")
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"scénario(s) inconnu(s) : {', '.join(sorted(unknown))}")
+    return args
+
+
+async def main():
+    args = parse_args()
+    logging.disable(logging.WARNING)  # pas de sortie des cogs au milieu du tableau
+
+    results = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "backend": args.backend,
+        "latency": args.latency,
+        "scenarios": {},
+    }
+    print(f"Store {args.backend}, latence REST {args.latency * 1000:.0f} ms")
+    print(f"{'scénario':<16}{'temps':>11}{'REST':>7}{'pic mémoire':>14}{'boucle max':>12}  vérifications")
+    for name in args.scenarios or SCENARIOS:
+        result = await run_scenario(SCENARIOS[name], args.backend, args.latency)
+        results["scenarios"][name] = result
+        print(
+            f"{name:<16}{result['wall_ms']:>8.0f} ms{result['rest_total']:>7}"
+            f"{result['peak_memory_kib'] / 1024:>10.1f} MiB{result['max_loop_stall_ms']:>9.1f} ms  {result['checks']}"
+        )
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=4)
+    print(f"Résultats écrits dans {args.output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
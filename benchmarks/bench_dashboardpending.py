@@ -0,0 +1,75 @@
+# benchmarks/bench_dashboardpending.py
+#
+# Latence de bout en bout de /dashboardpending avec 200 propositions contre
+# un faux client Discord (50 ms par fetch_user), cache utilisateur vide :
+# résolution séquentielle (ancien comportement) contre préchargement
+# concurrent borné.
+#
+# Usage : python benchmarks/bench_dashboardpending.py
+
+import asyncio
+import contextlib
+import functools
+import io
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from add_command import AddCommand
+from models import Proposal
+from storage import JsonStore
+from user_cache import UserResolver
+from benchmarks.fake_discord import FakeBot, FakeGuild, FakeInteraction, FakeUser
+
+PROPOSAL_COUNT = 200
+VICTIM_COUNT = 150
+PROPOSER_COUNT = 50
+FETCH_LATENCY = 0.05
+ITEMS = ["Tournée", "Viennoiserie", "Kebab", "Café"]
+
+
+def make_store():
+    store = JsonStore()
+    expires_at = (datetime.now() + timedelta(hours=5)).isoformat()
+    for i in range(PROPOSAL_COUNT):
+        store.add_proposal(str(i), Proposal.new(
+            1000 + i % VICTIM_COUNT,
+            ITEMS[i % len(ITEMS)],
+            1 + i % 3,
+            reason=f"raison {i}" if i % 2 else None,
+            added_by=5000 + i % PROPOSER_COUNT,
+            timestamp=datetime.now().isoformat(),
+            expires_at=expires_at,
+            message_id=10_000 + i,
+            channel_id=10,
+        ))
+    return store
+
+
+async def run(concurrency):
+    bot = FakeBot(make_store(), latency=FETCH_LATENCY)
+    bot.resolver = UserResolver(bot)
+    if concurrency is not None:
+        bot.resolver.prefetch = functools.partial(bot.resolver.prefetch, concurrency=concurrency)
+    cog = AddCommand(bot)
+    interaction = FakeInteraction(bot, FakeUser(42), FakeGuild())
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        await cog.dashboardpending.callback(cog, interaction)
+    return time.perf_counter() - start, bot.rest.calls["fetch_user"]
+
+
+async def main():
+    before, before_calls = await run(concurrency=1)
+    after, after_calls = await run(concurrency=None)
+    print(f"/dashboardpending, {PROPOSAL_COUNT} propositions, fetch_user à {FETCH_LATENCY * 1000:.0f} ms")
+    print(f"Résolution séquentielle : {before * 1000:8.1f} ms ({before_calls} fetch_user)")
+    print(f"Préchargement concurrent: {after * 1000:8.1f} ms ({after_calls} fetch_user)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,109 @@
+# benchmarks/bench_logging.py
+#
+# Temps de construction de toutes les pages de /dashboard sur un grand
+# livre de 10 000 entrées selon la configuration des logs :
+#   - DEBUG écrit directement dans un fichier depuis la boucle (équivalent
+#     des anciens print() inconditionnels),
+#   - DEBUG via QueueHandler / QueueListener (écriture dans un thread),
+#   - INFO via la file (niveau par défaut : les lignes DEBUG ne sont même
+#     pas formatées).
+#
+# Usage : python benchmarks/bench_logging.py
+
+import asyncio
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dashboard_command import Dashboard
+from log_config import LOG_FORMAT, setup_logging
+from models import LedgerEntry
+from storage import JsonStore
+from user_cache import UserResolver
+from benchmarks.fake_discord import FakeBot, FakeGuild, FakeInteraction, FakeUser
+
+ENTRY_COUNT = 10_000
+USER_COUNT = 800
+ITEMS = ["Tournée", "Viennoiserie", "Kebab", "Café"]
+
+
+def make_store(rng):
+    store = JsonStore()
+    for _ in range(ENTRY_COUNT):
+        store.add_entry(1000 + rng.randrange(USER_COUNT), LedgerEntry.new(
+            rng.choice(ITEMS),
+            rng.randint(1, 3),
+            rng.choice([None, "anniversaire", "retard en réunion"]),
+            5000 + rng.randrange(50),
+        ))
+    return store
+
+
+async def build_all_pages(store, users):
+    """Lance /dashboard puis rend chaque page (cog neuf : cache de rendu vide)"""
+    bot = FakeBot(store, users=users)
+    bot.resolver = UserResolver(bot)
+    cog = Dashboard(bot)
+    interaction = FakeInteraction(bot, users[0], FakeGuild(members=users))
+
+    start = time.perf_counter()
+    await cog.dashboard.callback(cog, interaction)
+    view = interaction.sent[-1][1].get("view")
+    pages = 1
+    while view and view.pages.has_next(view.page):
+        view.page += 1
+        view.render()
+        pages += 1
+    return time.perf_counter() - start, pages
+
+
+def count_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return sum(1 for _ in f)
+
+
+async def run(label, configure, store, users, log_path):
+    open(log_path, "w").close()
+    stream = open(log_path, "a", encoding="utf-8")
+    stop = configure(stream)
+    try:
+        elapsed, pages = await build_all_pages(store, users)
+    finally:
+        stop()
+        stream.close()
+    print(f"{label:<28}: {elapsed * 1000:7.1f} ms, {pages} pages, {count_lines(log_path)} lignes écrites")
+
+
+def direct_debug(stream):
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(logging.DEBUG)
+    return lambda: None
+
+
+def queued(level):
+    def configure(stream):
+        return setup_logging(stream, level=level, levels="").stop
+    return configure
+
+
+async def main():
+    store = make_store(random.Random(16))
+    users = [FakeUser(1000 + i) for i in range(USER_COUNT)] + [FakeUser(5000 + i) for i in range(50)]
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, "bench.log")
+        print(f"/dashboard complet, {ENTRY_COUNT} entrées, {USER_COUNT} utilisateurs")
+        await run("DEBUG écrit sur la boucle", direct_debug, store, users, log_path)
+        await run("DEBUG via QueueListener", queued("DEBUG"), store, users, log_path)
+        await run("INFO via QueueListener", queued("INFO"), store, users, log_path)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,106 @@
+# benchmarks/bench_memory.py
+#
+# Mémoire occupée (tracemalloc, après chargement) par un grand livre de
+# 100 000 entrées et 2 000 propositions en attente :
+#   - ancien modèle : les dicts tels que json.load les produit (une copie
+#     du nom de l'item et des clés par entrée, votes en liste),
+#   - modèle actuel : LedgerEntry / Proposal à slots, items codés en
+#     entiers, votes en set.
+# Vérifie aussi que la réécriture redonne le JSON d'origine, entrées de
+# chaque utilisateur dans leur ordre d'ajout.
+#
+# Usage : python benchmarks/bench_memory.py
+
+import gc
+import json
+import os
+import random
+import sys
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import _copy_ledger, _copy_pending, _ledger_from_json, _load_json, _pending_from_json
+
+ENTRY_COUNT = 100_000
+USER_COUNT = 800
+PROPOSAL_COUNT = 2_000
+ITEMS = ["Tournée", "Viennoiserie", "Kebab", "Café"]
+REASONS = [None, None, "anniversaire", "retard en réunion", "pari perdu", "unique"]
+
+
+def reason(rng):
+    """Un tiers sans raison, une sur six en texte libre, le reste reprises d'une entrée à l'autre"""
+    choice = rng.choice(REASONS)
+    return f"raison libre n°{rng.randrange(10**6)}" if choice == "unique" else choice
+
+
+def write_files(tmp, rng):
+    ledger = {}
+    for _ in range(ENTRY_COUNT):
+        ledger.setdefault(str(1000 + rng.randrange(USER_COUNT)), []).append({
+            "item": rng.choice(ITEMS),
+            "amount": rng.randint(1, 3),
+            "reason": reason(rng),
+            "added_by": 5000 + rng.randrange(50),
+        })
+    pending = {
+        str(10**18 + i): {
+            "user_id": 1000 + rng.randrange(USER_COUNT),
+            "item": rng.choice(ITEMS),
+            "amount": rng.randint(1, 5),
+            "reason": reason(rng),
+            "added_by": 5000 + rng.randrange(50),
+            "timestamp": "2025-01-01T12:00:00",
+            "expires_at": "2025-01-01T22:00:00",
+            "votes": sorted(rng.sample(range(7000, 7100), rng.randint(0, 3))),
+            "message_id": 2 * 10**18 + i,
+            "channel_id": 10,
+        }
+        for i in range(PROPOSAL_COUNT)
+    }
+    paths = os.path.join(tmp, "ledger.json"), os.path.join(tmp, "pending.json")
+    for path, data in zip(paths, (ledger, pending)):
+        with open(path, "w") as f:
+            json.dump(data, f, indent=4)
+    return paths
+
+
+def retained(load):
+    """Octets encore alloués par le résultat de `load` une fois les temporaires libérés"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    data = load()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return data, size
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger_path, pending_path = write_files(tmp, random.Random(20))
+
+        legacy_ledger, legacy_ledger_size = retained(lambda: _load_json(ledger_path))
+        legacy_pending, legacy_pending_size = retained(lambda: _load_json(pending_path))
+        ledger, ledger_size = retained(lambda: _ledger_from_json(_load_json(ledger_path)))
+        pending, pending_size = retained(lambda: _pending_from_json(_load_json(pending_path)))
+
+    print(f"Grand livre : {ENTRY_COUNT} entrées, {USER_COUNT} utilisateurs")
+    print(f"  dicts JSON    : {legacy_ledger_size / 2**20:7.1f} MiB ({legacy_ledger_size / ENTRY_COUNT:5.0f} o/entrée)")
+    print(f"  LedgerEntry   : {ledger_size / 2**20:7.1f} MiB ({ledger_size / ENTRY_COUNT:5.0f} o/entrée), "
+          f"÷{legacy_ledger_size / ledger_size:.1f}")
+    print(f"Propositions : {PROPOSAL_COUNT}")
+    print(f"  dicts JSON    : {legacy_pending_size / 2**20:7.2f} MiB ({legacy_pending_size / PROPOSAL_COUNT:5.0f} o/proposition)")
+    print(f"  Proposal      : {pending_size / 2**20:7.2f} MiB ({pending_size / PROPOSAL_COUNT:5.0f} o/proposition), "
+          f"÷{legacy_pending_size / pending_size:.1f}")
+
+    same = _copy_ledger(ledger) == legacy_ledger and _copy_pending(pending) == legacy_pending
+    print(f"Réécriture conforme au JSON d'origine : {'oui' if same else 'NON'}")
+    return 0 if same else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
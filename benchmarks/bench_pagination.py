@@ -0,0 +1,145 @@
+# benchmarks/bench_pagination.py
+#
+# Nombre de pages de /dashboard et /dashboardsummary sur un grand livre
+# synthétique de 5000 entrées : ancien découpage (tailles estimées avec
+# marges, 5500 caractères / 24 fields) contre remplissage exact aux
+# limites Discord (6000 caractères / 25 fields). Vérifie aussi que chaque
+# page respecte les limites et que chaque entrée apparaît une seule fois.
+# Mesure enfin un second parcours identique servi par le cache de rendu,
+# puis un parcours après une modification du ledger (cache invalidé).
+#
+# Usage : python benchmarks/bench_pagination.py
+
+import asyncio
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dashboard_command import Dashboard, ICONS
+from pagination import MAX_EMBED_CHARS, MAX_EMBED_FIELDS
+from models import LedgerEntry
+from storage import JsonStore
+from user_cache import UserResolver
+from benchmarks.fake_discord import FakeBot, FakeGuild, FakeInteraction, FakeUser
+
+ENTRY_COUNT = 5000
+USER_COUNT = 400
+ITEMS = ["Tournée", "Viennoiserie", "Kebab", "Café"]
+
+
+def make_store(rng):
+    store = JsonStore()
+    # Répartition inégale : quelques gros débiteurs, beaucoup de petits
+    weights = [1 / (rank + 1) for rank in range(USER_COUNT)]
+    for _ in range(ENTRY_COUNT):
+        user_id = 1000 + rng.choices(range(USER_COUNT), weights)[0]
+        reason_len = rng.choice([0, 0, 12, 40, 100])
+        store.add_entry(user_id, LedgerEntry.new(
+            rng.choice(ITEMS),
+            rng.randint(1, 3),
+            "r" * reason_len or None,
+            5000 + rng.randrange(50),
+        ))
+    return store
+
+
+def legacy_ledger_pages(store):
+    """Ancien découpage : une section utilisateur n'est jamais coupée,
+    sa taille est estimée avec +50 par header et +100 par entrée.
+    Retourne (pages, pages dépassant 25 fields que Discord refuserait)"""
+    pages, oversized, fields, size = 0, 0, 0, 0
+    base = len("🧾 Grand Livre Détaillé") + len("Liste complète de toutes les entrées enregistrées.")
+    for user_id in store.ledger_user_ids():
+        entries = store.user_entries(user_id)
+        estimate = len(f"**⸻ ✦ <@{user_id}> ✦ ⸻**\n") + 50
+        for entry in entries:
+            reason_text = entry.reason or "Aucune"
+            estimate += len(f"{ICONS.get(entry.item, '❓')} {entry.item} × {entry.amount}")
+            estimate += len(f"**Raison :** {reason_text}\n**Ajouté par :** Utilisateur inconnu\n⠀") + 100
+        if fields and (fields + 1 + len(entries) > 24 or size + estimate > 5500):
+            pages, oversized = pages + 1, oversized + (fields > MAX_EMBED_FIELDS)
+            fields, size = 0, 0
+        if not fields:
+            size = base
+        fields += 1 + len(entries)
+        size += estimate
+    if fields:
+        pages, oversized = pages + 1, oversized + (fields > MAX_EMBED_FIELDS)
+    return pages, oversized
+
+
+async def walk_pages(cog, command, bot, users):
+    """Lance la commande puis parcourt toutes les pages avec le bouton suivant"""
+    interaction = FakeInteraction(bot, users[0], FakeGuild(members=users))
+    with contextlib.redirect_stdout(io.StringIO()):
+        await command.callback(cog, interaction)
+    _, kwargs = interaction.sent[-1]
+    view = kwargs.get("view")
+    embeds = [kwargs["embed"]]
+    while view and view.pages.has_next(view.page):
+        view.page += 1
+        embeds.append(view.render())
+    return embeds
+
+
+def check_limits(embeds):
+    for embed in embeds:
+        assert len(embed) <= MAX_EMBED_CHARS, len(embed)
+        assert len(embed.fields) <= MAX_EMBED_FIELDS, len(embed.fields)
+
+
+async def main():
+    rng = random.Random(14)
+    store = make_store(rng)
+    users = [FakeUser(1000 + i) for i in range(USER_COUNT)] + [FakeUser(5000 + i) for i in range(50)]
+    bot = FakeBot(store, users=users)
+    bot.resolver = UserResolver(bot)
+    cog = Dashboard(bot)
+
+    start = time.perf_counter()
+    ledger = await walk_pages(cog, cog.dashboard, bot, users)
+    ledger_time = time.perf_counter() - start
+    summary = await walk_pages(cog, cog.dashboardsummary, bot, users)
+    check_limits(ledger)
+    check_limits(summary)
+
+    entry_fields = sum(1 for e in ledger for f in e.fields if f.name != "⠀")
+    assert entry_fields == ENTRY_COUNT, entry_fields
+    continued = sum(1 for e in ledger for f in e.fields if f.value.endswith("(suite)"))
+
+    print(f"Grand livre synthétique : {ENTRY_COUNT} entrées, {len(store.ledger_user_ids())} utilisateurs")
+    legacy_pages, oversized = legacy_ledger_pages(store)
+    field_floor = -(-(ENTRY_COUNT + len(store.ledger_user_ids())) // MAX_EMBED_FIELDS)
+    print(f"/dashboard        ancien : {legacy_pages:4d} pages (dont {oversized} au-delà de 25 fields, refusées par Discord)")
+    print(
+        f"/dashboard        exact  : {len(ledger):4d} pages "
+        f"({sum(len(e.fields) for e in ledger) / len(ledger):.1f} fields, "
+        f"{sum(len(e) for e in ledger) / len(ledger):.0f} caractères en moyenne, "
+        f"{continued} sections coupées, {ledger_time * 1000:.0f} ms pour tout parcourir)"
+    )
+    print(f"/dashboard        minimum: {field_floor:4d} pages (1 field par entrée + 1 header par utilisateur)")
+    print(f"/dashboardsummary exact  : {len(summary):4d} pages")
+
+    # Même dashboard relancé sans modification, puis après un acquittement
+    start = time.perf_counter()
+    again = await walk_pages(cog, cog.dashboard, bot, users)
+    cached_time = time.perf_counter() - start
+    assert [[(f.name, f.value) for f in e.fields] for e in again] == \
+        [[(f.name, f.value) for f in e.fields] for e in ledger]
+    store.settle(1000, store.user_entries(1000)[0].item, 1)
+    start = time.perf_counter()
+    await walk_pages(cog, cog.dashboard, bot, users)
+    invalidated_time = time.perf_counter() - start
+    print(
+        f"/dashboard        relancé: {cached_time * 1000:.0f} ms depuis le cache, "
+        f"{invalidated_time * 1000:.0f} ms après un /fulfill ({cog.render_cache.stats()})"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,67 @@
+# benchmarks/bench_persistence.py
+#
+# Mesure le blocage maximal de la boucle asyncio pendant l'écriture d'un
+# ledger de 50k entrées : écriture synchrone (ancien save_ledger) contre
+# JsonStore.flush() (copie sur la boucle, sérialisation dans un thread).
+#
+# Usage : python benchmarks/bench_persistence.py
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import JsonStore, _copy_ledger, _ledger_from_json
+from benchmarks.harness import measure_stall
+
+ENTRY_COUNT = 50_000
+USER_COUNT = 500
+MAX_LOOP_STALL_MS = 50  # garantie : blocage maximal de la boucle par écriture
+ITEMS = ["Tournée", "Viennoiserie", "Kebab", "Café"]
+
+
+def make_ledger():
+    ledger = {}
+    for i in range(ENTRY_COUNT):
+        ledger.setdefault(str(100000 + i % USER_COUNT), []).append({
+            "item": ITEMS[i % len(ITEMS)],
+            "amount": 1 + i % 3,
+            "reason": f"raison {i}" if i % 2 else None,
+            "added_by": 200000 + i % 37,
+        })
+    return ledger
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger_file = os.path.join(tmp, "ledger.json")
+        store = JsonStore(
+            ledger_file=ledger_file,
+            pending_file=os.path.join(tmp, "pending.json"),
+            totals_file=os.path.join(tmp, "totals.json"),
+        )
+        store.ledger = _ledger_from_json(make_ledger())
+
+        async def sync_write():
+            with open(ledger_file, "w") as f:
+                json.dump(_copy_ledger(store.ledger), f, indent=4)
+
+        async def store_write():
+            store._ledger_dirty = True
+            await store.flush()
+
+        sync_time, sync_stall = await measure_stall(sync_write)
+        store_time, store_stall = await measure_stall(store_write)
+
+    print(f"Ledger : {ENTRY_COUNT} entrées, {USER_COUNT} utilisateurs")
+    print(f"Écriture synchrone   : {sync_time:8.1f} ms, boucle bloquée jusqu'à {sync_stall:8.1f} ms")
+    print(f"JsonStore.flush()    : {store_time:8.1f} ms, boucle bloquée jusqu'à {store_stall:8.1f} ms")
+    print(f"Garantie             : blocage < {MAX_LOOP_STALL_MS} ms")
+    return 0 if store_stall < MAX_LOOP_STALL_MS else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
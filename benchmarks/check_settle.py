@@ -0,0 +1,191 @@
+# benchmarks/check_settle.py
+#
+# Vérification aléatoire de settle() : les files FIFO par utilisateur et
+# par item doivent donner exactement le même résultat que l'ancien
+# algorithme (parcours de toute la liste de l'utilisateur, plus anciennes
+# d'abord, puis reconstruction de la liste).
+#
+# Des milliers d'ajouts et d'acquittements tirés au hasard (quantités
+# supérieures à la dette, items ou utilisateurs absents compris) sont
+# appliqués aux trois stores et à l'ancien algorithme ; après chaque
+# opération on compare la quantité acquittée, les dettes restantes dans
+# leur ordre d'ajout (tous items confondus), les totaux et le nombre
+# d'entrées. Le store journalisé est ensuite rechargé depuis son journal
+# et comparé à nouveau.
+#
+# Mesure enfin le coût d'un acquittement sur un utilisateur de 20 000
+# entrées, avant / après.
+#
+# Usage : python benchmarks/check_settle.py [--ops 5000] [--seed 21]
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import LedgerEntry
+from sqlite_store import SQLiteStore
+from storage import JournalStore, JsonStore
+
+ITEMS = ["Tournée", "Viennoiserie", "Kebab", "Café"]
+USERS = [str(1000 + i) for i in range(12)]
+
+
+# ============================================================
+# 🔵 ANCIEN ALGORITHME (référence)
+# ============================================================
+def legacy_settle(ledger, uid, item, amount):
+    remaining = amount
+    for entry in ledger.get(uid, []):
+        if entry["item"] != item:
+            continue
+        if remaining <= 0:
+            break
+        if entry["amount"] <= remaining:
+            remaining -= entry["amount"]
+            entry["amount"] = 0
+        else:
+            entry["amount"] -= remaining
+            remaining = 0
+    entries = ledger.get(uid, [])
+    ledger[uid] = [e for e in entries if e["amount"] > 0]
+    if not ledger[uid]:
+        del ledger[uid]
+    return amount - remaining
+
+
+def debts_in_order(entries):
+    """[(item, quantité)], de la plus ancienne à la plus récente, tous items confondus"""
+    return [
+        (entry["item"], entry["amount"]) if isinstance(entry, dict) else (entry.item, entry.amount)
+        for entry in entries
+    ]
+
+
+def snapshot(store):
+    return {uid: debts_in_order(entries) for uid, entries in store.ledger_items()}
+
+
+def legacy_snapshot(ledger):
+    return {uid: debts_in_order(entries) for uid, entries in ledger.items()}
+
+
+def totals(store):
+    return {uid: dict(t) for uid, t in store.user_totals() if t}
+
+
+def legacy_totals(ledger):
+    result = {}
+    for uid, debts in legacy_snapshot(ledger).items():
+        user_totals = result[uid] = {}
+        for item, amount in debts:
+            user_totals[item] = user_totals.get(item, 0) + amount
+    return result
+
+
+# ============================================================
+# 🔵 ÉQUIVALENCE
+# ============================================================
+async def check(ops, seed):
+    rng = random.Random(seed)
+    legacy = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = lambda name: os.path.join(tmp, name)
+        files = {"ledger_file": path("ledger.json"), "pending_file": path("pending.json"), "totals_file": path("totals.json")}
+        stores = {
+            "json": JsonStore(**files),
+            "journal": JournalStore(path("snapshot.json"), path("journal.jsonl"),
+                                    **{k: v + ".j" for k, v in files.items()}),
+            "sqlite": SQLiteStore(path("tournees.db")),
+        }
+        for store in stores.values():
+            await store.start()
+
+        mismatches = []
+        for op in range(ops):
+            uid = rng.choice(USERS + ["999"])  # 999 : jamais endetté
+            item = rng.choice(ITEMS)
+            if uid != "999" and rng.random() < 0.55:
+                amount = rng.randint(1, 5)
+                legacy.setdefault(uid, []).append({"item": item, "amount": amount})
+                for store in stores.values():
+                    store.add_entry(uid, LedgerEntry.new(item, amount))
+                expected = None
+            else:
+                amount = rng.choice([1, 1, 2, 3, 5, 8, 20])
+                expected = legacy_settle(legacy, uid, item, amount)
+            for name, store in stores.items():
+                if expected is not None:
+                    settled = store.settle(uid, item, amount)
+                    if settled != expected:
+                        mismatches.append((op, name, "settled", settled, expected))
+                if snapshot(store) != legacy_snapshot(legacy) or totals(store) != legacy_totals(legacy):
+                    mismatches.append((op, name, "ledger"))
+            if mismatches:
+                break
+
+        entry_count = sum(len(entries) for entries in legacy.values())
+        if stores["json"]._entry_count != entry_count:
+            mismatches.append(("end", "json", "entry_count", stores["json"]._entry_count, entry_count))
+
+        # Rechargement du store journalisé depuis son journal (sans compaction)
+        journal = stores.pop("journal")
+        journal._journal.close()
+        journal._journal = None
+        reloaded = JournalStore(path("snapshot.json"), path("journal.jsonl"), **{k: v + ".j" for k, v in files.items()})
+        reloaded.load()
+        if snapshot(reloaded) != legacy_snapshot(legacy) or totals(reloaded) != legacy_totals(legacy):
+            mismatches.append(("end", "journal", "reload"))
+        reloaded._journal.close()
+        for store in stores.values():
+            await store.close()
+    return entry_count, mismatches
+
+
+# ============================================================
+# 🔵 COÛT D'UN ACQUITTEMENT
+# ============================================================
+def time_settle(entry_count=20_000, repeats=200):
+    rng = random.Random(0)
+    rows = [(rng.choice(ITEMS), rng.randint(1, 3)) for _ in range(entry_count)]
+    legacy = {"1": [{"item": item, "amount": amount} for item, amount in rows]}
+    store = JsonStore()
+    for item, amount in rows:
+        store.add_entry("1", LedgerEntry.new(item, amount))
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        legacy_settle(legacy, "1", "Café", 1)
+    legacy_time = (time.perf_counter() - start) / repeats
+    start = time.perf_counter()
+    for _ in range(repeats):
+        store.settle("1", "Café", 1)
+    store_time = (time.perf_counter() - start) / repeats
+    return entry_count, legacy_time, store_time
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Équivalence de settle() avec l'ancien algorithme")
+    parser.add_argument("--ops", type=int, default=5_000, help="opérations tirées au hasard")
+    parser.add_argument("--seed", type=int, default=21, help="graine du tirage")
+    args = parser.parse_args()
+
+    entry_count, mismatches = await check(args.ops, args.seed)
+    verdict = "identique à l'ancien algorithme" if not mismatches else "DIVERGENCE"
+    print(f"{args.ops} opérations aléatoires, {entry_count} entrée(s) restantes : {verdict} (json, journal, sqlite)")
+    for mismatch in mismatches[:10]:
+        print("  ", mismatch)
+
+    count, legacy_time, store_time = time_settle()
+    print(f"Acquittement d'une unité sur {count} entrées : "
+          f"{legacy_time * 1e6:.0f} µs avant, {store_time * 1e6:.1f} µs avec les files par item")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,253 @@
+# benchmarks/fake_discord.py
+#
+# Doublures minimales de discord.py pour faire tourner les cogs hors ligne.
+# Chaque appel qui serait un appel REST est compté et retardé de `latency`.
+
+import asyncio
+import itertools
+import random
+from collections import Counter
+
+from locks import KeyedLock
+from storage import GuildStores
+
+_ids = itertools.count(900_000_000_000_000_000)
+
+
+class FakeUser:
+    def __init__(self, user_id, name=None):
+        self.id = user_id
+        self.name = name or f"user{user_id}"
+        self.display_name = self.name
+        self.mention = f"<@{user_id}>"
+        self.avatar = None
+        self.bot = False
+
+    def __str__(self):
+        return self.name
+
+
+class FakeRest:
+    """Compteur d'appels REST simulés, avec latence injectée
+
+    `jitter` ajoute un délai aléatoire (0 à jitter secondes) : deux appels
+    lancés dans un ordre peuvent alors se terminer dans l'autre. `messages`
+    garde chaque message par ID, pour relire l'état final d'une carte.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = Counter()
+        self.messages = {}
+        self.user = None  # compte du bot, auteur des add_reaction
+        self._rng = random.Random(seed)
+
+    async def call(self, name):
+        self.calls[name] += 1
+        # rend toujours la main, comme un vrai appel réseau
+        await asyncio.sleep(self.latency + self._rng.uniform(0, self.jitter))
+
+    @property
+    def total(self):
+        return sum(self.calls.values())
+
+
+class FakeGuild:
+    def __init__(self, guild_id=1, members=()):
+        self.id = guild_id
+        self.members = {m.id: m for m in members}
+
+    def get_member(self, user_id):
+        return self.members.get(user_id)
+
+
+class FakeReaction:
+    """Une réaction d'un message : `count` et `me` viennent avec le message,
+    la liste des auteurs coûte un appel REST par page de 100"""
+
+    def __init__(self, rest, emoji):
+        self.rest = rest
+        self.emoji = emoji
+        self.authors = []
+
+    @property
+    def count(self):
+        return len(self.authors)
+
+    @property
+    def me(self):
+        return any(user.id == self.rest.user.id for user in self.authors)
+
+    async def users(self):
+        authors = list(self.authors)
+        for start in range(0, max(len(authors), 1), 100):
+            await self.rest.call("reaction.users")
+            for user in authors[start:start + 100]:
+                yield user
+
+
+class FakeMessage:
+    def __init__(self, rest, channel_id, message_id=None):
+        self.rest = rest
+        self.id = message_id or next(_ids)
+        rest.messages[self.id] = self
+        self.channel = type("FakeChannelRef", (), {"id": channel_id})()
+        self.embeds = []
+        self.reactions = []
+
+    async def edit(self, **kwargs):
+        await self.rest.call("message.edit")
+        if kwargs.get("embed") is not None:
+            self.embeds = [kwargs["embed"]]
+
+    async def add_reaction(self, emoji):
+        await self.rest.call("message.add_reaction")
+        self.react(emoji, self.rest.user)
+
+    def react(self, emoji, user):
+        """Réaction posée depuis un client Discord : aucun appel REST du bot"""
+        reaction = next((r for r in self.reactions if r.emoji == emoji), None)
+        if reaction is None:
+            reaction = FakeReaction(self.rest, emoji)
+            self.reactions.append(reaction)
+        if all(author.id != user.id for author in reaction.authors):
+            reaction.authors.append(user)
+
+    async def clear_reactions(self):
+        await self.rest.call("message.clear_reactions")
+        self.reactions = []
+
+    async def fetch(self):
+        await self.rest.call("message.fetch")
+        return self
+
+
+class FakePartialMessageable:
+    def __init__(self, rest, channel_id):
+        self.rest = rest
+        self.id = channel_id
+
+    def get_partial_message(self, message_id):
+        return self.rest.messages.get(message_id) or FakeMessage(self.rest, self.id, message_id)
+
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self.interaction = interaction
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    async def defer(self, **kwargs):
+        self._done = True
+        await self.interaction.rest.call("interaction.defer")
+
+    async def send_message(self, content=None, **kwargs):
+        self._done = True
+        await self.interaction.rest.call("interaction.send_message")
+        message = FakeMessage(self.interaction.rest, self.interaction.channel_id)
+        if kwargs.get("embed") is not None:
+            message.embeds = [kwargs["embed"]]
+        self.interaction.sent.append((content, kwargs))
+        return type("FakeCallbackResponse", (), {"resource": message})()
+
+    async def edit_message(self, content=None, **kwargs):
+        self._done = True
+        await self.interaction.rest.call("interaction.edit_message")
+        self.interaction.sent.append((content, kwargs))
+
+    async def send_modal(self, modal):
+        self._done = True
+        await self.interaction.rest.call("interaction.send_modal")
+        self.interaction.modals.append(modal)
+
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self.interaction = interaction
+
+    async def send(self, content=None, **kwargs):
+        await self.interaction.rest.call("followup.send")
+        self.interaction.sent.append((content, kwargs))
+
+
+class FakeChannel:
+    def __init__(self, rest, channel_id):
+        self.rest = rest
+        self.id = channel_id
+
+    async def send(self, content=None, **kwargs):
+        await self.rest.call("channel.send")
+        message = FakeMessage(self.rest, self.id)
+        message.embeds = [kwargs["embed"]] if kwargs.get("embed") is not None else []
+        return message
+
+
+class FakeInteraction:
+    def __init__(self, bot, user, guild=None, channel_id=10):
+        self.id = next(_ids)
+        self.client = bot
+        self.user = user
+        self.guild = guild
+        self.guild_id = guild.id if guild else None
+        self.channel_id = channel_id
+        self.channel = FakeChannel(bot.rest, channel_id)
+        self.rest = bot.rest
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+        self.data = {}
+        self.sent = []
+        self.modals = []
+
+
+class FakeBot:
+    """Ce que les cogs utilisent de commands.Bot : stores, resolver, verrous, cogs et REST
+
+    `store` (déjà démarré) sert les données du serveur `guild_id`.
+    """
+
+    def __init__(self, store, latency=0.0, users=(), jitter=0.0, guild_id=1):
+        self.rest = FakeRest(latency, jitter)
+        self.stores = GuildStores(data_dir=None)  # aucun autre serveur sur disque
+        if store is not None:
+            self.stores.adopt(guild_id, store)
+        self.proposal_locks = KeyedLock()
+        self.ledger_locks = KeyedLock()
+        self.user = FakeUser(1, "BoT'avernier")
+        self.rest.user = self.user
+        self.users = {u.id: u for u in users}
+        self.cogs = {}
+        self.resolver = None
+
+    def get_cog(self, name):
+        return self.cogs.get(name)
+
+    def get_user(self, user_id):
+        return None  # cache gateway vide : tout passe par fetch_user
+
+    async def fetch_user(self, user_id):
+        await self.rest.call("fetch_user")
+        return self.users.get(user_id) or FakeUser(user_id)
+
+    def get_partial_messageable(self, channel_id):
+        return FakePartialMessageable(self.rest, channel_id)
+
+
+class FakeReactionPayload:
+    """Ce que on_raw_reaction_add lit d'un RawReactionActionEvent"""
+
+    def __init__(self, message_id, user_id, emoji="👍", channel_id=10, guild_id=1):
+        self.message_id = message_id
+        self.user_id = user_id
+        self.emoji = emoji
+        self.channel_id = channel_id
+        self.guild_id = guild_id
+
+
+async def submit_modal(modal, interaction, **values):
+    """Remplit les TextInput du modal puis appelle on_submit, comme Discord"""
+    for name, value in values.items():
+        getattr(modal, name)._value = value
+    await modal.on_submit(interaction)
@@ -0,0 +1,177 @@
+# benchmarks/harness.py
+#
+# Outils de mesure communs : retard de la boucle asyncio, appels REST
+# simulés, temps écoulé et pic mémoire d'un bloc de scénario.
+
+import asyncio
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import JournalStore, JsonStore
+from user_cache import UserResolver
+from benchmarks.fake_discord import FakeBot
+
+BACKENDS = ("json", "journal", "sqlite")
+
+
+# ============================================================
+# 🔵 RETARD DE LA BOUCLE
+# ============================================================
+class LoopProbe:
+    """Mesure le plus long retard d'un sleep de 1 ms tant qu'elle tourne"""
+
+    def __init__(self):
+        self.max_stall = 0.0
+        self._task = None
+        self._done = False
+        self._last = 0.0
+
+    def _record(self):
+        now = time.perf_counter()
+        self.max_stall = max(self.max_stall, now - self._last - 0.001)
+        self._last = now
+
+    async def _run(self):
+        while not self._done:
+            await asyncio.sleep(0.001)
+            self._record()
+
+    def start(self):
+        self._done = False
+        self._last = time.perf_counter()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        # La boucle a pu rester bloquée jusqu'ici sans que la sonde se réveille
+        self._record()
+        self._done = True
+        await self._task
+
+
+async def measure_stall(write):
+    """Lance `write` en mesurant le plus long retard de la boucle (ms, ms)"""
+    probe = LoopProbe()
+    probe.start()
+    await asyncio.sleep(0.01)
+    start = time.perf_counter()
+    await write()
+    elapsed = time.perf_counter() - start
+    await probe.stop()
+    return elapsed * 1000, probe.max_stall * 1000
+
+
+# ============================================================
+# 🔵 MESURE D'UN BLOC
+# ============================================================
+class Measure:
+    """async with bench.measure(bot): ... — mesure uniquement le bloc"""
+
+    def __init__(self, rest, trace_memory):
+        self.rest = rest
+        self.trace_memory = trace_memory
+        self.wall_ms = 0.0
+        self.rest_calls = {}
+        self.max_loop_stall_ms = 0.0
+        self.peak_memory_kib = None
+        self._probe = LoopProbe()
+
+    async def __aenter__(self):
+        self._calls_before = Counter(self.rest.calls)
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            self._memory_before = tracemalloc.get_traced_memory()[0]
+        self._probe.start()
+        self._start = time.perf_counter()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.wall_ms = (time.perf_counter() - self._start) * 1000
+        await self._probe.stop()
+        self.max_loop_stall_ms = self._probe.max_stall * 1000
+        self.rest_calls = dict(Counter(self.rest.calls) - self._calls_before)
+        if self.trace_memory:
+            self.peak_memory_kib = (tracemalloc.get_traced_memory()[1] - self._memory_before) / 1024
+
+
+class Bench:
+    """Contexte d'un scénario : stores dans un dossier temporaire, faux bot, mesure"""
+
+    def __init__(self, tmp, backend="json", latency=0.0, trace_memory=False):
+        self.tmp = tmp
+        self.backend = backend
+        self.latency = latency
+        self.trace_memory = trace_memory
+        self.measurement = None
+        self._stores = []
+
+    async def make_store(self):
+        path = lambda name: os.path.join(self.tmp, name)
+        files = {
+            "ledger_file": path("ledger.json"),
+            "pending_file": path("pending.json"),
+            "totals_file": path("totals.json"),
+        }
+        if self.backend == "sqlite":
+            from sqlite_store import SQLiteStore
+            store = SQLiteStore(path("tournees.db"))
+        elif self.backend == "journal":
+            store = JournalStore(path("snapshot.json"), path("journal.jsonl"), **files)
+        else:
+            store = JsonStore(**files)
+        await store.start()
+        self._stores.append(store)
+        return store
+
+    def make_bot(self, store, users=(), guild_id=1):
+        bot = FakeBot(store, latency=self.latency, users=users, guild_id=guild_id)
+        bot.resolver = UserResolver(bot)
+        return bot
+
+    def measure(self, bot):
+        self.measurement = Measure(bot.rest, self.trace_memory)
+        return self.measurement
+
+    async def close(self):
+        for store in self._stores:
+            await store.close()
+
+
+async def run_scenario(scenario, backend="json", latency=0.0):
+    """Lance le scénario deux fois : une pour les temps, une sous tracemalloc pour la mémoire
+
+    Retourne un dict sérialisable en JSON.
+    """
+    result = {}
+    for trace_memory in (False, True):
+        # Les restes des scénarios précédents ne sont pas collectés pendant la mesure
+        gc.collect()
+        with tempfile.TemporaryDirectory() as tmp:
+            bench = Bench(tmp, backend, latency, trace_memory)
+            if trace_memory:
+                tracemalloc.start()
+            try:
+                checks = await scenario(bench)
+            finally:
+                await bench.close()
+                if trace_memory:
+                    tracemalloc.stop()
+
+        measurement = bench.measurement
+        if trace_memory:
+            result["peak_memory_kib"] = round(measurement.peak_memory_kib, 1)
+        else:
+            result.update({
+                "wall_ms": round(measurement.wall_ms, 2),
+                "rest_calls": measurement.rest_calls,
+                "rest_total": sum(measurement.rest_calls.values()),
+                "max_loop_stall_ms": round(measurement.max_loop_stall_ms, 2),
+                "checks": checks,
+            })
+    return result
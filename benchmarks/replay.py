@@ -0,0 +1,325 @@
+# benchmarks/replay.py
+#
+# Rejoue une trace enregistrée en production (TRACE_FILE, voir
+# interaction_trace.py) à travers les cogs, contre le faux client Discord.
+#
+# Les interactions d'un même utilisateur sont rejouées dans l'ordre
+# (commande → vue → modal) ; un clic vise la dernière vue envoyée à cet
+# utilisateur. Une réaction sur une carte attend que la proposition
+# correspondante ait été recréée, puis vise la nouvelle carte. Chaque
+# serveur de la trace a son propre store, comme en production.
+#
+# Usage : python -m benchmarks.replay trace.jsonl[.gz] [--speed 1|10|max]
+#             [--backend json|journal|sqlite] [--latency 0.05]
+#             [--profile] [--output replay_results.json]
+
+import argparse
+import asyncio
+import cProfile
+import json
+import logging
+import os
+import pstats
+import statistics
+import tempfile
+import time
+from collections import Counter, defaultdict
+from functools import partial
+
+import discord
+from discord import AppCommandOptionType
+
+from benchmarks.harness import BACKENDS, Bench
+from benchmarks.fake_discord import FakeGuild, FakeInteraction, FakeReactionPayload, FakeUser
+from add_command import AddCommand
+from dashboard_command import Dashboard
+from fulfill_command import FulfillCommand
+from interaction_trace import open_trace
+from storage import GuildStores, create_store
+
+log = logging.getLogger(__name__)
+
+
+def load_trace(path):
+    with open_trace(path, "r") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return [r for r in records if r["k"] != "start"]
+
+
+# ============================================================
+# 🔵 REJEU
+# ============================================================
+class Replayer:
+    # Traces enregistrées avant le partitionnement par serveur : pas de "g"
+    DEFAULT_GUILD_ID = 1
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.guilds = {}       # guild_id → serveur rejoué
+        self.cogs = [AddCommand(bot), Dashboard(bot), FulfillCommand(bot)]
+        for cog in self.cogs:
+            bot.cogs[cog.__cog_name__] = cog
+        self.commands = {
+            command.name: (cog, command)
+            for cog in self.cogs
+            for command in cog.get_app_commands()
+        }
+        self.views = {}        # user_id → dernière vue envoyée à cet utilisateur
+        self.modals = {}       # user_id → dernier modal ouvert
+        self.cards = {}        # ID de proposition enregistré → Future du message_id rejoué
+        self.durations = defaultdict(list)  # type d'événement → durées de traitement (s)
+        self.errors = Counter()
+        self.unmatched = Counter()
+        self._user_tail = {}   # user_id → tâche précédente de cet utilisateur
+
+    def guild(self, record):
+        """Serveur rejoué de l'événement (créé à la première apparition)"""
+        guild_id = int(record.get("g") or self.DEFAULT_GUILD_ID)
+        if guild_id not in self.guilds:
+            self.guilds[guild_id] = FakeGuild(guild_id)
+        return self.guilds[guild_id]
+
+    def user(self, guild, user_id):
+        """Membre d'un serveur rejoué (créé à la première apparition)"""
+        user_id = int(user_id)
+        if user_id not in guild.members:
+            guild.members[user_id] = FakeUser(user_id)
+        return guild.members[user_id]
+
+    def interaction(self, record):
+        guild = self.guild(record)
+        return FakeInteraction(self.bot, self.user(guild, record["u"]), guild, record.get("c") or 10)
+
+    def collect(self, user_id, interaction):
+        """Retient la vue ou le modal que la réponse a ouvert pour cet utilisateur"""
+        for _, kwargs in interaction.sent:
+            if kwargs.get("view") is not None:
+                self.views[user_id] = kwargs["view"]
+        for modal in interaction.modals:
+            self.modals[user_id] = modal
+
+    # ---------- ordonnancement ----------
+
+    def dispatch(self, record):
+        """Lance le traitement d'un événement et retourne sa tâche"""
+        kind = record["k"]
+        if kind == "reaction":
+            return asyncio.create_task(self.reaction(record))
+
+        if kind == "modal":
+            # Les réactions sur la carte qu'il va créer attendront ce Future
+            self.cards[str(record["id"])] = asyncio.get_running_loop().create_future()
+
+        handler = {"slash": self.slash, "component": self.component, "modal": self.modal}[kind]
+        previous = self._user_tail.get(record["u"])
+
+        async def run():
+            if previous:
+                await asyncio.wait([previous])
+            await self._timed(kind, handler(record))
+
+        task = asyncio.create_task(run())
+        self._user_tail[record["u"]] = task
+        return task
+
+    async def _timed(self, kind, coro):
+        start = time.perf_counter()
+        try:
+            await coro
+        except Exception as e:
+            self.errors[kind] += 1
+            log.debug("Replay of a %s event failed: %r", kind, e)
+        self.durations[kind].append(time.perf_counter() - start)
+
+    async def run(self, records, speed=None):
+        """speed : facteur d'accélération (1, 10...), None pour enchaîner sans attendre"""
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        tasks = []
+        for record in records:
+            if speed:
+                await asyncio.sleep(max(0, start + record["t"] / speed - loop.time()))
+            tasks.append(self.dispatch(record))
+        await asyncio.gather(*tasks)
+
+    # ---------- événements ----------
+
+    async def slash(self, record):
+        if record["n"] not in self.commands:
+            self.unmatched["slash"] += 1
+            return
+        cog, command = self.commands[record["n"]]
+        kwargs = {}
+        for parameter in command.parameters:
+            if parameter.name not in record["o"]:
+                continue
+            value = record["o"][parameter.name]
+            if parameter.type == AppCommandOptionType.user:
+                value = self.user(self.guild(record), value)
+            kwargs[parameter.name] = value
+
+        interaction = self.interaction(record)
+        await command.callback(cog, interaction, **kwargs)
+        self.collect(record["u"], interaction)
+
+    async def component(self, record):
+        view = self.views.get(record["u"])
+        item = None
+        if view is not None and record.get("pos"):
+            row, column = record["pos"]
+            layout = view.to_components()
+            if row < len(layout) and column < len(layout[row]["components"]):
+                custom_id = layout[row]["components"][column]["custom_id"]
+                item = next((c for c in view.children if getattr(c, "custom_id", None) == custom_id), None)
+        if item is None:
+            self.unmatched["component"] += 1
+            return
+
+        interaction = self.interaction(record)
+        interaction.data = {"custom_id": item.custom_id, "values": record.get("v", [])}
+        item._refresh_state(interaction, interaction.data)
+        await item.callback(interaction)
+        self.collect(record["u"], interaction)
+
+    async def modal(self, record):
+        card = self.cards[str(record["id"])]
+        try:
+            modal = self.modals.pop(record["u"], None)
+            if modal is None:
+                self.unmatched["modal"] += 1
+                return
+            inputs = [c for c in modal.children if isinstance(c, discord.ui.TextInput)]
+            for text_input, value in zip(inputs, record["v"]):
+                text_input._value = value
+
+            interaction = self.interaction(record)
+            await modal.on_submit(interaction)
+            self.collect(record["u"], interaction)
+
+            # ReasonModal crée la proposition sous l'ID de l'interaction
+            store = self.bot.stores.get_loaded(interaction.guild_id)
+            proposal = store.get_proposal(str(interaction.id)) if store else None
+            card.set_result(proposal.message_id if proposal else None)
+        finally:
+            if not card.done():
+                card.set_result(None)
+
+    async def reaction(self, record):
+        # L'attente de la carte n'est pas comptée dans la durée du traitement
+        message_id = record["m"]
+        if "p" in record:
+            card = self.cards.get(record["p"])
+            replayed = await card if card else None
+            if replayed is None:
+                self.unmatched["reaction"] += 1
+                return
+            message_id = replayed
+        guild = self.guild(record)
+        if self.bot.stores.get_loaded(guild.id) is None:
+            # Le cog ignorerait la réaction : aucun store ouvert pour ce serveur
+            self.unmatched["reaction"] += 1
+            return
+        payload = FakeReactionPayload(message_id, int(record["u"]), record["e"], record.get("c") or 10, guild.id)
+        await self._timed("reaction", self.cogs[0].on_raw_reaction_add(payload))
+
+
+# ============================================================
+# 🔵 LIGNE DE COMMANDE
+# ============================================================
+def parse_args():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.replay", description="Rejeu d'une trace d'interactions")
+    parser.add_argument("trace", help="fichier enregistré via TRACE_FILE (.jsonl ou .jsonl.gz)")
+    parser.add_argument("--speed", default="max", help="1, 10... (facteur d'accélération) ou max")
+    parser.add_argument("--backend", choices=BACKENDS, default="json", help="store utilisé")
+    parser.add_argument("--latency", type=float, default=0.0, help="latence injectée par appel REST (secondes)")
+    parser.add_argument("--profile", action="store_true", help="affiche les fonctions les plus coûteuses")
+    parser.add_argument("--output", help="fichier JSON des résultats")
+    args = parser.parse_args()
+    args.speed = None if args.speed == "max" else float(args.speed.rstrip("x×"))
+    return args
+
+
+def summarize(durations):
+    ordered = sorted(durations)
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 2),
+        "p95_ms": round(ordered[int(0.95 * (len(ordered) - 1))] * 1000, 2),
+        "max_ms": round(ordered[-1] * 1000, 2),
+    }
+
+
+async def main():
+    args = parse_args()
+    logging.disable(logging.WARNING)
+    records = load_trace(args.trace)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bench = Bench(tmp, args.backend, args.latency)
+        # Un dossier par serveur de la trace, ouvert à son premier événement
+        stores = GuildStores(os.path.join(tmp, "guilds"), partial(create_store, backend=args.backend))
+        bot = bench.make_bot(None)
+        bot.stores = stores
+        replayer = Replayer(bot)
+        add_cog = replayer.cogs[0]
+        await add_cog.cog_load()
+
+        profiler = cProfile.Profile() if args.profile else None
+        try:
+            async with bench.measure(bot) as measurement:
+                if profiler:
+                    profiler.enable()
+                await replayer.run(records, args.speed)
+                for _, store in stores.loaded():
+                    await store.flush()
+                if profiler:
+                    profiler.disable()
+            guilds = len(stores)
+            ledger_entries = sum(
+                len(entries) for _, store in stores.loaded() for _, entries in store.ledger_items()
+            )
+            pending_left = sum(len(list(store.pending_items())) for _, store in stores.loaded())
+        finally:
+            await add_cog.cog_unload()
+            await stores.close()
+            await bench.close()
+
+    results = {
+        "trace": args.trace,
+        "events": len(records),
+        "speed": args.speed or "max",
+        "backend": args.backend,
+        "latency": args.latency,
+        "wall_ms": round(measurement.wall_ms, 2),
+        "rest_calls": measurement.rest_calls,
+        "max_loop_stall_ms": round(measurement.max_loop_stall_ms, 2),
+        "handlers": {kind: summarize(d) for kind, d in replayer.durations.items()},
+        "errors": dict(replayer.errors),
+        "unmatched": dict(replayer.unmatched),
+        "guilds": guilds,
+        "ledger_entries": ledger_entries,
+        "pending_left": pending_left,
+    }
+
+    duration = records[-1]["t"] if records else 0
+    print(f"{len(records)} événement(s) sur {duration:.1f} s rejoués à la vitesse {results['speed']} "
+          f"en {measurement.wall_ms / 1000:.2f} s (store {args.backend})")
+    for kind, stats in results["handlers"].items():
+        print(f"  {kind:<10} ×{stats['count']:<6} moyenne {stats['mean_ms']:7.2f} ms, "
+              f"p95 {stats['p95_ms']:7.2f} ms, max {stats['max_ms']:7.2f} ms")
+    print(f"  REST : {sum(measurement.rest_calls.values())} appel(s), boucle bloquée jusqu'à "
+          f"{measurement.max_loop_stall_ms:.1f} ms")
+    print(f"  erreurs : {results['errors'] or 0}, non rejoués : {results['unmatched'] or 0}")
+    print(f"  grand livre : {ledger_entries} entrée(s), {pending_left} proposition(s) en attente "
+          f"sur {guilds} serveur(s)")
+
+    if profiler:
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(25)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+        print(f"Résultats écrits dans {args.output}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,434 @@
+# benchmarks/scenarios.py
+#
+# Scénarios de la suite. Chacun prépare son état hors mesure, mesure
+# uniquement le bloc `async with bench.measure(bot)` et retourne des
+# vérifications de cohérence (dict sérialisable).
+
+import asyncio
+import os
+import random
+from datetime import datetime, timedelta
+from functools import partial
+
+from add_command import AddCommand, ReasonModal, AddView
+from dashboard_command import Dashboard
+from fulfill_command import FulfillCommand, FulfillModal
+from models import LedgerEntry, Proposal
+from storage import GuildStores, create_store
+from benchmarks.fake_discord import (
+    FakeGuild, FakeInteraction, FakeReactionPayload, FakeUser, submit_modal,
+)
+
+ITEMS = ["Tournée", "Viennoiserie", "Kebab", "Café"]
+GUILD_ID = 1
+
+
+def make_users(first_id, count):
+    return [FakeUser(first_id + i) for i in range(count)]
+
+
+def add_entries(store, rng, user_ids, count, proposers):
+    for _ in range(count):
+        store.add_entry(rng.choice(user_ids), LedgerEntry.new(
+            rng.choice(ITEMS),
+            rng.randint(1, 3),
+            rng.choice([None, "anniversaire", "retard en réunion"]),
+            rng.choice(proposers).id,
+        ))
+
+
+async def propose(bot, cog, guild, proposer, victim, item, amount, reason):
+    """/add puis envoi du modal de raison, comme depuis le client Discord"""
+    interaction = FakeInteraction(bot, proposer, guild)
+    await cog.add.callback(cog, interaction, victim)
+    modal = ReasonModal([victim.id], item, amount, AddView([victim.id]))
+    submit = FakeInteraction(bot, proposer, guild)
+    await submit_modal(modal, submit, reason=reason)
+    return str(submit.id)
+
+
+async def propose_group(bot, cog, guild, proposer, victims, item, amount, reason):
+    """/addgroup avec les mentions des victimes, puis envoi du modal de raison"""
+    interaction = FakeInteraction(bot, proposer, guild)
+    await cog.addgroup.callback(cog, interaction, " ".join(f"<@{v.id}>" for v in victims))
+    view = interaction.sent[-1][1]["view"]
+    modal = ReasonModal(view.user_ids, item, amount, view)
+    submit = FakeInteraction(bot, proposer, guild)
+    await submit_modal(modal, submit, reason=reason)
+    return str(submit.id)
+
+
+async def open_proposals(bench, count, rng):
+    store = await bench.make_store()
+    victims = make_users(1000, 150)
+    proposers = make_users(5000, 50)
+    bot = bench.make_bot(store, victims + proposers)
+    guild = FakeGuild(GUILD_ID, victims + proposers)
+    cog = AddCommand(bot)
+    bot.cogs["AddCommand"] = cog
+    # Couples (victime, item) distincts : aucun doublon n'est fusionné
+    targets = rng.sample([(victim, item) for victim in victims for item in ITEMS], count)
+    proposal_ids = await asyncio.gather(*(
+        propose(bot, cog, guild, rng.choice(proposers), victim,
+                item, rng.randint(1, 5), rng.choice(["", "pari perdu"]))
+        for victim, item in targets
+    ))
+    return store, bot, cog, proposal_ids
+
+
+# ============================================================
+# 🔵 SCÉNARIOS
+# ============================================================
+async def dashboard_10k(bench):
+    """/dashboard complet sur 10 000 entrées, puis clic sur ▶️ jusqu'à la dernière page"""
+    rng = random.Random(1)
+    store = await bench.make_store()
+    users = make_users(1000, 800)
+    proposers = make_users(5000, 50)
+    add_entries(store, rng, [u.id for u in users], 10_000, proposers)
+    bot = bench.make_bot(store, users + proposers)
+    guild = FakeGuild(GUILD_ID, users + proposers)
+    cog = Dashboard(bot)
+
+    async with bench.measure(bot):
+        interaction = FakeInteraction(bot, users[0], guild)
+        await cog.dashboard.callback(cog, interaction)
+        view = interaction.sent[-1][1].get("view")
+        pages = 1
+        while view and view.pages.has_next(view.page):
+            await view.next.callback(FakeInteraction(bot, users[0], guild))
+            pages += 1
+
+    return {"entries": 10_000, "pages": pages}
+
+
+async def dashboard_user(bench):
+    """/dashboard user=… pour quelqu'un qui a 300 entrées, puis clic sur ▶️ jusqu'à la dernière page"""
+    rng = random.Random(9)
+    store = await bench.make_store()
+    user = FakeUser(1000)
+    proposers = make_users(5000, 50)
+    add_entries(store, rng, [user.id], 300, proposers)
+    bot = bench.make_bot(store, [user] + proposers)
+    guild = FakeGuild(GUILD_ID, [user] + proposers)
+    cog = Dashboard(bot)
+
+    async with bench.measure(bot):
+        interaction = FakeInteraction(bot, user, guild)
+        await cog.dashboard.callback(cog, interaction, user)
+        embeds = [interaction.sent[-1][1]["embed"]]
+        view = interaction.sent[-1][1].get("view")
+        while view and view.pages.has_next(view.page):
+            await view.next.callback(FakeInteraction(bot, user, guild))
+            embeds.append(view.render())
+
+    return {
+        "entries": 300,
+        "pages": len(embeds),
+        "within_limits": all(len(e.fields) <= 25 and len(e) <= 6000 for e in embeds),
+        "all_entries_shown": sum(len(e.fields) for e in embeds) == 300,
+    }
+
+
+async def vote_storm(bench):
+    """500 propositions ouvertes, puis toutes les réactions arrivent en même temps"""
+    rng = random.Random(2)
+    store, bot, cog, proposal_ids = await open_proposals(bench, 500, rng)
+    voters = make_users(7000, 100)
+
+    payloads = []
+    for proposal_id in proposal_ids:
+        message_id = store.get_proposal(proposal_id).message_id
+        payloads.append(FakeReactionPayload(message_id, bot.user.id))  # réaction du bot
+        payloads.append(FakeReactionPayload(message_id, rng.choice(voters).id, emoji="🎉"))
+        for voter in rng.sample(voters, 3):
+            payloads.append(FakeReactionPayload(message_id, voter.id))
+    # Réactions sur des messages qui ne sont pas des propositions
+    payloads += [FakeReactionPayload(rng.randrange(10**6), rng.choice(voters).id) for _ in range(500)]
+    rng.shuffle(payloads)
+
+    async with bench.measure(bot):
+        await asyncio.gather(*(cog.on_raw_reaction_add(p) for p in payloads))
+        await store.flush()
+
+    ledger_entries = sum(len(entries) for _, entries in store.ledger_items())
+    return {
+        "proposals": len(proposal_ids),
+        "reactions": len(payloads),
+        "ledger_entries": ledger_entries,
+        "pending_left": len(list(store.pending_items())),
+        "consistent": ledger_entries == len(proposal_ids),
+    }
+
+
+async def mass_expiry(bench):
+    """500 propositions arrivées à échéance pendant un arrêt, expirées en un lot"""
+    rng = random.Random(3)
+    store, bot, cog, proposal_ids = await open_proposals(bench, 500, rng)
+    past = (datetime.now() - timedelta(minutes=1)).isoformat()
+    for proposal_id in proposal_ids:
+        store.update_proposal(proposal_id, expires_at=past)
+
+    async with bench.measure(bot):
+        await cog.expire_proposals([(GUILD_ID, pid) for pid in proposal_ids])
+        await store.flush()
+
+    return {
+        "proposals": len(proposal_ids),
+        "pending_left": len(list(store.pending_items())),
+        "consistent": not list(store.pending_items()),
+    }
+
+
+async def rehydrate(bench):
+    """Redémarrage avec 500 propositions ouvertes, dont 40 ont reçu un 👍 pendant l'arrêt"""
+    rng = random.Random(9)
+    store, bot, cog, proposal_ids = await open_proposals(bench, 500, rng)
+    voters = make_users(7000, 100)
+    voted = rng.sample(proposal_ids, 40)
+    for proposal_id in voted:
+        message = bot.rest.messages[store.get_proposal(proposal_id).message_id]
+        message.react("👍", rng.choice(voters))
+
+    # Arrêt du bot : l'ancien cog ne tourne plus, un nouveau reprend pending
+    await cog.cog_unload()
+    cog = AddCommand(bot)
+    bot.cogs["AddCommand"] = cog
+
+    try:
+        async with bench.measure(bot):
+            await cog.rehydrate()
+            await store.flush()
+    finally:
+        await cog.cog_unload()
+
+    ledger_entries = sum(len(entries) for _, entries in store.ledger_items())
+    return {
+        "proposals": len(proposal_ids),
+        "voted_during_downtime": len(voted),
+        "ledger_entries": ledger_entries,
+        "pending_left": len(list(store.pending_items())),
+        "consistent": ledger_entries == len(voted)
+        and all(store.get_proposal(pid) is None for pid in voted),
+    }
+
+
+async def fulfill_burst(bench):
+    """200 /fulfill lancés en même temps, chacun jusqu'à la soumission du modal"""
+    rng = random.Random(4)
+    store = await bench.make_store()
+    users = make_users(1000, 200)
+    proposers = make_users(5000, 50)
+    add_entries(store, rng, [u.id for u in users], 2_000, proposers)
+    bot = bench.make_bot(store, users + proposers)
+    guild = FakeGuild(GUILD_ID, users + proposers)
+    cog = FulfillCommand(bot)
+    before = sum(sum(totals.values()) for _, totals in store.user_totals())
+
+    async def fulfill(user):
+        await cog.fulfill.callback(cog, FakeInteraction(bot, user, guild), user)
+        due = {}
+        for entry in store.user_entries(user.id):
+            due[entry.item] = due.get(entry.item, 0) + entry.amount
+        if not due:
+            return 0
+        item = rng.choice(sorted(due))
+        amount = min(due[item], rng.randint(1, 5))
+        await submit_modal(FulfillModal(user.id, item, amount), FakeInteraction(bot, user, guild), comment="payé au bar")
+        return amount
+
+    async with bench.measure(bot):
+        settled = await asyncio.gather(*(fulfill(user) for user in users))
+        await store.flush()
+
+    after = sum(sum(totals.values()) for _, totals in store.user_totals())
+    ledger_sum = sum(e.amount for _, entries in store.ledger_items() for e in entries)
+    return {
+        "fulfills": len(users),
+        "settled": sum(settled),
+        "consistent": before - sum(settled) == after == ledger_sum,
+    }
+
+
+async def bulk_fulfill(bench):
+    """Fin de soirée : toute une table (20 personnes) acquittée en un seul /fulfillbulk"""
+    rng = random.Random(5)
+    store = await bench.make_store()
+    users = make_users(1000, 200)
+    proposers = make_users(5000, 50)
+    add_entries(store, rng, [u.id for u in users], 2_000, proposers)
+    bot = bench.make_bot(store, users + proposers)
+    guild = FakeGuild(GUILD_ID, users + proposers)
+    cog = FulfillCommand(bot)
+    table = rng.sample(users, 20)
+    # La moitié solde tout, l'autre moitié une unité de chaque item dû
+    lines = ", ".join(
+        f"<@{user.id}> tout" if i % 2 else ", ".join(f"<@{user.id}> {item} 1" for item in store.totals_for(user.id))
+        for i, user in enumerate(table)
+    )
+    expected = sum(
+        sum(store.totals_for(user.id).values()) if i % 2 else len(store.totals_for(user.id))
+        for i, user in enumerate(table)
+    )
+    before = sum(sum(totals.values()) for _, totals in store.user_totals())
+    version = store.version
+
+    async with bench.measure(bot):
+        interaction = FakeInteraction(bot, users[0], guild)
+        await cog.fulfillbulk.callback(cog, interaction, lines, "payé au bar")
+        await store.flush()
+
+    after = sum(sum(totals.values()) for _, totals in store.user_totals())
+    ledger_sum = sum(e.amount for _, entries in store.ledger_items() for e in entries)
+    return {
+        "users": len(table),
+        "settled": before - after,
+        "ledger_mutations": store.version - version,
+        "consistent": before - after == expected and after == ledger_sum,
+    }
+
+
+async def group_proposal(bench):
+    """Tournée pour une table de 20 : 20 × (/add + 👍) comparé à un /addgroup + 👍"""
+    store = await bench.make_store()
+    table = make_users(1000, 20)
+    proposer, voter = make_users(5000, 2)
+    bot = bench.make_bot(store, table + [proposer, voter])
+    guild = FakeGuild(GUILD_ID, table + [proposer, voter])
+    cog = AddCommand(bot)
+    bot.cogs["AddCommand"] = cog
+
+    # Référence hors mesure : une proposition et un vote par victime
+    calls_before, version = bot.rest.total, store.version
+    for victim in table:
+        proposal_id = await propose(bot, cog, guild, proposer, victim, "Tournée", 1, "pot de départ")
+        await cog.on_raw_reaction_add(FakeReactionPayload(store.get_proposal(proposal_id).message_id, voter.id))
+    single_calls, single_mutations = bot.rest.total - calls_before, store.version - version
+    before = {v.id: store.totals_for(v.id).get("Tournée", 0) for v in table}
+
+    version = store.version
+    async with bench.measure(bot):
+        proposal_id = await propose_group(bot, cog, guild, proposer, table, "Tournée", 1, "pot de départ")
+        message_id = store.get_proposal(proposal_id).message_id
+        await cog.on_raw_reaction_add(FakeReactionPayload(message_id, voter.id))
+        await store.flush()
+
+    card = bot.rest.messages[message_id].embeds[0]
+    return {
+        "victims": len(table),
+        "rest_calls_one_per_victim": single_calls,
+        "ledger_mutations_one_per_victim": single_mutations,
+        "ledger_mutations": store.version - version,
+        "consistent": card.title == "✅ Tournée Validée !"
+                      and all(store.totals_for(v.id).get("Tournée", 0) == before[v.id] + 1 for v in table)
+                      and store.get_proposal(proposal_id) is None,
+    }
+
+
+async def duplicate_proposals(bench):
+    """5 personnes proposent la même tournée pour 40 victimes, avec 500 autres propositions ouvertes"""
+    rng = random.Random(7)
+    store, bot, cog, _ = await open_proposals(bench, 500, rng)
+    victims = make_users(3000, 40)
+    proposers = make_users(6000, 5)
+    guild = FakeGuild(GUILD_ID, victims + proposers)
+    open_before = len(store.pending_items())
+
+    async with bench.measure(bot):
+        for proposer in proposers:
+            for victim in victims:
+                await propose(bot, cog, guild, proposer, victim, "Kebab", 1, f"relance de {proposer.id}")
+        await store.flush()
+
+    cards = [store.find_proposal_for(victim.id, "Kebab") for victim in victims]
+    merged = [store.get_proposal(pid) for pid in cards if pid]
+    return {
+        "submissions": len(proposers) * len(victims),
+        "cards_created": len(store.pending_items()) - open_before,
+        "consistent": len(merged) == len(victims)
+                      and all(p.amount == len(proposers) and p.reason.count("relance") == len(proposers) for p in merged),
+    }
+
+
+def partition_files(stores, guild_id):
+    """(nom, taille, date de modification) des fichiers du dossier d'un serveur"""
+    directory = os.path.join(stores.data_dir, str(guild_id))
+    return sorted(
+        (name, os.stat(os.path.join(directory, name)).st_size, os.stat(os.path.join(directory, name)).st_mtime_ns)
+        for name in os.listdir(directory)
+    )
+
+
+async def guild_partitions(bench):
+    """Un gros serveur (20 000 entrées), un petit (200) et un avec une proposition ouverte :
+    redémarrage (on_ready), /fulfillbulk puis /dashboardsummary dans le petit"""
+    rng = random.Random(8)
+    data_dir = os.path.join(bench.tmp, "guilds")
+    factory = partial(create_store, backend=bench.backend)
+    users = make_users(1000, 300)
+    proposers = make_users(5000, 50)
+    big_id, small_id, voting_id = 10, 20, 30
+
+    # Données des trois serveurs écrites sur disque, puis redémarrage : rien d'ouvert
+    stores = GuildStores(data_dir, factory)
+    add_entries(await stores.get(big_id), rng, [u.id for u in users[:200]], 20_000, proposers)
+    add_entries(await stores.get(small_id), rng, [u.id for u in users[200:]], 200, proposers)
+    add_entries(await stores.get(voting_id), rng, [u.id for u in users[200:]], 200, proposers)
+    expires_at = (datetime.now() + timedelta(hours=1)).isoformat()
+    (await stores.get(voting_id)).add_proposal("1", Proposal.new(
+        users[250].id, "Kebab", 1, added_by=proposers[0].id, expires_at=expires_at, message_id=42, channel_id=10,
+    ))
+    await stores.close()
+    big_files = partition_files(stores, big_id)
+
+    # idle_timeout=0 : chaque passage d'éviction ferme tout serveur sans proposition en attente
+    stores = GuildStores(data_dir, factory, idle_timeout=0)
+    bot = bench.make_bot(None, users + proposers)
+    bot.stores = stores
+    guild = FakeGuild(small_id, users[200:] + proposers)
+    add, fulfill, dashboard = AddCommand(bot), FulfillCommand(bot), Dashboard(bot)
+    bot.cogs["AddCommand"] = add
+    lines = ", ".join(f"<@{user.id}> tout" for user in users[200:210])
+
+    try:
+        async with bench.measure(bot):
+            await add.on_ready()
+            loaded_after_ready = sorted(guild_id for guild_id, _ in stores.loaded())
+            await stores.evict_idle()
+            await fulfill.fulfillbulk.callback(fulfill, FakeInteraction(bot, users[200], guild), lines, None)
+            await stores.get_loaded(small_id).flush()
+            interaction = FakeInteraction(bot, users[200], guild)
+            await dashboard.dashboardsummary.callback(dashboard, interaction)
+
+        shown = " ".join(
+            f"{field.name} {field.value}"
+            for _, kwargs in interaction.sent if kwargs.get("embed")
+            for field in kwargs["embed"].fields
+        )
+        small_store = stores.get_loaded(small_id)
+        small_entries = sum(len(entries) for _, entries in small_store.ledger_items())
+        await stores.evict_idle()
+        return {
+            "loaded_after_ready": loaded_after_ready,
+            "small_guild_entries": small_entries,
+            "big_guild_untouched": stores.get_loaded(big_id) is None and partition_files(stores, big_id) == big_files,
+            "no_other_guild_shown": not any(f"<@{user.id}>" in shown for user in users[:200]) and "<@" in shown,
+            "loaded_after_eviction": sorted(guild_id for guild_id, _ in stores.loaded()),
+        }
+    finally:
+        await add.cog_unload()
+        await stores.close()
+
+
+SCENARIOS = {
+    "dashboard_10k": dashboard_10k,
+    "dashboard_user": dashboard_user,
+    "vote_storm": vote_storm,
+    "mass_expiry": mass_expiry,
+    "rehydrate": rehydrate,
+    "fulfill_burst": fulfill_burst,
+    "bulk_fulfill": bulk_fulfill,
+    "group_proposal": group_proposal,
+    "duplicate_proposals": duplicate_proposals,
+    "guild_partitions": guild_partitions,
+}
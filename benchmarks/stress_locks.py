@@ -0,0 +1,203 @@
+# benchmarks/stress_locks.py
+#
+# Test de charge des verrous par proposition et par utilisateur : des
+# milliers de 👍, d'acquittements, de rafraîchissements de compte à rebours
+# et d'expirations arrivent en même temps, avec une latence REST aléatoire
+# (les éditions de cartes peuvent se terminer dans le désordre).
+#
+# Vérifie ensuite, exactement :
+#   - les totaux = dettes initiales + propositions validées - quantités
+#     publiées dans les messages d'acquittement, et = la somme du grand livre ;
+#   - l'état final de chaque carte correspond au store (validée, annulée,
+#     ou en attente avec le bon nombre de votes) ;
+#   - une proposition sans expiration est validée ssi elle a reçu
+#     REQUIRED_VOTES votes distincts ;
+#   - plus aucun verrou n'est tenu.
+#
+# Usage : python -m benchmarks.stress_locks [--backend json|journal|sqlite]
+#             [--seed 19]
+
+import argparse
+import asyncio
+import logging
+import random
+import sys
+import tempfile
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+import add_command
+from add_command import AddCommand
+from fulfill_command import FulfillModal
+from user_cache import UserResolver
+from benchmarks.fake_discord import (
+    FakeBot, FakeGuild, FakeInteraction, FakeReactionPayload, submit_modal,
+)
+from benchmarks.harness import BACKENDS, Bench
+from benchmarks.scenarios import ITEMS, add_entries, make_users, propose
+
+REQUIRED_VOTES = 3       # plusieurs votes par carte : les éditions intermédiaires comptent
+PROPOSAL_COUNT = 500
+FULFILL_COUNT = 1_000
+REFRESH_COUNT = 500
+EXPIRING_SHARE = 0.2     # propositions dont l'échéance tombe pendant la tempête
+LATENCY = 0.002
+JITTER = 0.008           # jusqu'à 8 ms de plus par appel REST
+SPREAD = 0.05            # les événements démarrent dans une fenêtre de 50 ms
+
+
+def current_totals(store):
+    return {uid: {item: n for item, n in totals.items() if n} for uid, totals in store.user_totals()}
+
+
+def ledger_totals(store):
+    totals = defaultdict(Counter)
+    for uid, entries in store.ledger_items():
+        for entry in entries:
+            totals[uid][entry.item] += entry.amount
+    return {uid: dict(+counter) for uid, counter in totals.items() if +counter}
+
+
+def card_title(bot, message_id):
+    embeds = bot.rest.messages[message_id].embeds
+    return embeds[0].title if embeds else None
+
+
+async def storm(backend, seed):
+    rng = random.Random(seed)
+    add_command.REQUIRED_VOTES = REQUIRED_VOTES
+    add_command.MERGE_WINDOW = 0  # chaque proposition garde sa propre carte
+    with tempfile.TemporaryDirectory() as tmp:
+        bench = Bench(tmp, backend)
+        store = await bench.make_store()
+        try:
+            victims = make_users(1000, 100)
+            proposers = make_users(5000, 50)
+            voters = make_users(7000, 40)
+            add_entries(store, rng, [u.id for u in victims], 1_000, proposers)
+            bot = FakeBot(store, latency=LATENCY, users=victims + proposers, jitter=JITTER)
+            bot.resolver = UserResolver(bot)
+            guild = FakeGuild(1, victims + proposers + voters)
+            cog = AddCommand(bot)
+            bot.cogs["AddCommand"] = cog
+
+            # 1️⃣ Propositions ouvertes (hors tempête)
+            proposal_ids = await asyncio.gather(*(
+                propose(bot, cog, guild, rng.choice(proposers), rng.choice(victims),
+                        rng.choice(ITEMS), rng.randint(1, 5), "")
+                for _ in range(PROPOSAL_COUNT)
+            ))
+            proposals = {pid: store.get_proposal(pid) for pid in proposal_ids}
+            expiring = set(rng.sample(proposal_ids, int(EXPIRING_SHARE * PROPOSAL_COUNT)))
+            past = (datetime.now() - timedelta(seconds=1)).isoformat()
+            for proposal_id in expiring:
+                store.update_proposal(proposal_id, expires_at=past)
+            seed_totals = current_totals(store)
+
+            # 2️⃣ Événements concurrents
+            events = []
+            distinct_voters = {}
+            for proposal_id, entry in proposals.items():
+                chosen = rng.sample(voters, rng.randint(0, REQUIRED_VOTES + 2))
+                distinct_voters[proposal_id] = len(chosen)
+                reactions = chosen + rng.sample(chosen, min(len(chosen), 2))  # doublons
+                for voter in reactions:
+                    payload = FakeReactionPayload(entry.message_id, voter.id)
+                    events.append(cog.on_raw_reaction_add(payload))
+            for _ in range(FULFILL_COUNT):
+                victim = rng.choice(victims)
+                modal = FulfillModal(victim.id, rng.choice(ITEMS), rng.randint(1, 5))
+                events.append(submit_modal(modal, FakeInteraction(bot, victim, guild), comment=""))
+            for proposal_id in rng.choices(proposal_ids, k=REFRESH_COUNT):
+                events.append(cog.refresh_countdown((guild.id, proposal_id)))
+            events.append(cog.expire_proposals([(guild.id, pid) for pid in sorted(expiring)]))
+
+            async def delayed(event):
+                await asyncio.sleep(rng.uniform(0, SPREAD))
+                await event
+
+            rng.shuffle(events)
+            start = time.perf_counter()
+            await asyncio.gather(*(delayed(event) for event in events))
+            elapsed = time.perf_counter() - start
+            await store.flush()
+
+            # 3️⃣ Vérifications
+            expected = defaultdict(Counter, {uid: Counter(t) for uid, t in seed_totals.items()})
+            cards_ok = True
+            votes_ok = True
+            outcomes = Counter()
+            for proposal_id, entry in proposals.items():
+                title = card_title(bot, entry.message_id)
+                pending = store.get_proposal(proposal_id)
+                if pending is not None:
+                    outcome = "pending"
+                    status = f"**{len(pending.votes)}/{REQUIRED_VOTES}**"
+                    card = bot.rest.messages[entry.message_id].embeds[0]
+                    cards_ok &= title.startswith("⏳") and card.fields[-1].value.startswith(status)
+                    cards_ok &= len(pending.votes) == distinct_voters[proposal_id] < REQUIRED_VOTES
+                elif title == "✅ Tournée Validée !":
+                    outcome = "validated"
+                    expected[str(entry.user_id)][entry.item] += entry.amount
+                elif title == "❌ Tournée Annulée":
+                    outcome = "expired"
+                    cards_ok &= proposal_id in expiring
+                else:
+                    outcome = "inconsistent"
+                    cards_ok = False
+                outcomes[outcome] += 1
+                if proposal_id not in expiring:
+                    votes_ok &= (outcome == "validated") == (distinct_voters[proposal_id] >= REQUIRED_VOTES)
+
+            published = 0
+            for message in bot.rest.messages.values():
+                if message.embeds and message.embeds[0].title == "✅ Tournée Acquittée !":
+                    fields = message.embeds[0].fields
+                    uid = fields[0].value.strip("<@>")
+                    item, amount = fields[1].value.rsplit(" ×", 1)
+                    expected[uid][item] -= int(amount)
+                    published += int(amount)
+            expected = {uid: dict(+counter) for uid, counter in expected.items() if +counter}
+            actual = current_totals(store)
+            from_ledger = ledger_totals(store)
+        finally:
+            await bench.close()
+
+    return {
+        "events": len(events),
+        "elapsed_s": elapsed,
+        "outcomes": dict(outcomes),
+        "settled": published,
+        "lock_waits": bot.proposal_locks.waits + bot.ledger_locks.waits,
+        "checks": {
+            "totals_exact": expected == actual == from_ledger,
+            "cards_match_store": cards_ok,
+            "validated_iff_enough_votes": votes_ok,
+            "locks_released": not len(bot.proposal_locks) and not len(bot.ledger_locks),
+        },
+    }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.stress_locks", description="Test de charge des verrous")
+    parser.add_argument("--backend", choices=BACKENDS, default="json", help="store utilisé")
+    parser.add_argument("--seed", type=int, default=19, help="graine du tirage des événements")
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    logging.disable(logging.WARNING)
+    result = await storm(args.backend, args.seed)
+    print(f"{result['events']} événements concurrents en {result['elapsed_s']:.2f} s (store {args.backend})")
+    print(f"  propositions : {result['outcomes']}, {result['settled']} unité(s) acquittée(s)")
+    print(f"  attentes de verrou : {result['lock_waits']}")
+    for name, ok in result["checks"].items():
+        print(f"  {'✅' if ok else '❌'} {name}")
+    if not all(result["checks"].values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
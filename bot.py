@@ -3,29 +3,59 @@
 import discord
 from discord.ext import commands
 import asyncio
+import logging
 from dotenv import load_dotenv
 import os
 
+from interaction_trace import TRACE_FILE, TraceRecorder
+from locks import KeyedLock
+from log_config import setup_logging
+from storage import GuildStores
+from user_cache import UserResolver
+
 load_dotenv()
 TOKEN = os.getenv("DISCORD_TOKEN")
+log = logging.getLogger("bot")
 
 intents = discord.Intents.default()
 intents.guilds = True 
 intents.members = True 
 
-bot = commands.Bot(command_prefix="!", intents=intents)
+# Shards ouverts automatiquement selon le nombre de serveurs
+bot = commands.AutoShardedBot(command_prefix="!", intents=intents)
+bot.stores = GuildStores()  # un store par serveur, ouvert à sa première utilisation
+bot.resolver = UserResolver(bot)
+bot.proposal_locks = KeyedLock()  # carte + votes d'une proposition, par ID
+bot.ledger_locks = KeyedLock()    # dettes d'un utilisateur, par (guild_id, user_id)
 
 @bot.event
 async def on_ready():
-    print(f"Bot connecté comme : {bot.user}")
+    log.info("Bot connecté comme : %s (%d shard(s), %d serveur(s))", bot.user, bot.shard_count or 1, len(bot.guilds))
     synced = await bot.tree.sync()
-    print(f"Slash commands synchronisées : {len(synced)}")
+    log.info("Slash commands synchronisées : %d", len(synced))
 
 async def main():
+    # Refuse de démarrer si des fichiers d'avant le partitionnement n'ont pas de serveur désigné
+    bot.stores.legacy_guild()
+    listener = setup_logging()
+    # Enregistrement opt-in des interactions (TRACE_FILE), rejouable hors ligne
+    recorder = TraceRecorder(bot, TRACE_FILE) if TRACE_FILE else None
     async with bot:
-        await bot.load_extension("add_command")
-        await bot.load_extension("dashboard_command")
-        await bot.load_extension("fulfill_command")
-        await bot.start(TOKEN)
+        try:
+            if recorder:
+                recorder.start()
+            await bot.stores.start()
+            await bot.load_extension("add_command")
+            await bot.load_extension("dashboard_command")
+            await bot.load_extension("fulfill_command")
+            await bot.start(TOKEN)
+        finally:
+            # Ordre d'arrêt : cogs déchargés (échéances et comptes à rebours arrêtés),
+            # puis stores fermés, puis logs vidés en dernier
+            await bot.close()
+            if recorder:
+                recorder.close()
+            await bot.stores.close()
+            listener.stop()
 
 asyncio.run(main())
\ No newline at end of file
@@ -2,16 +2,14 @@ import discord
 from discord import app_commands
 from discord.ext import commands
 
-import json
-import os
+import re
+import unicodedata
 from datetime import datetime
 
 # ============================================================
 # Constants
 # ============================================================
 
-LEDGER_FILE = "ledger.json"
-
 ICONS = {
     "Tournée": "🍺",
     "Viennoiserie": "🥐",
@@ -19,20 +17,98 @@ ICONS = {
     "Café": "☕",
 }
 
+BULK_MAX_USERS = 25  # une ligne de résumé par personne, dans un seul embed
+FIELD_MAX_CHARS = 1024  # Limite Discord : valeur d'un field
+ALL_WORDS = {"tout", "tous", "toutes", "*"}  # toute la quantité due (ou tous les items, seul)
+
 # ============================================================
-# JSON Helpers
+# ACQUITTEMENT GROUPÉ : lecture des lignes
 # ============================================================
 
-def load_ledger():
-    if not os.path.exists(LEDGER_FILE):
-        return {}
-    with open(LEDGER_FILE, "r") as f:
-        return json.load(f)
-
-
-def save_ledger(data):
-    with open(LEDGER_FILE, "w") as f:
-        json.dump(data, f, indent=4)
+LINE_SEPARATOR = re.compile(r"[,;\n]+")
+LINE_PATTERN = re.compile(r"^<@!?(\d+)>\s*(.*?)\s*(?:[x×]?\s*(\d+))?$", re.IGNORECASE)
+
+
+def _normalize(text):
+    """Minuscules sans accents : « Tournées » → « tournees »"""
+    text = unicodedata.normalize("NFKD", text.strip().lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def _match_item(token):
+    """Nom de l'item désigné par `token` (nom, pluriel ou emoji)"""
+    word = _normalize(token)
+    for item, emoji in ICONS.items():
+        if token.strip() == emoji or word.removesuffix("s") == _normalize(item):
+            return item
+    raise ValueError(f"item inconnu : « {token.strip()} »")
+
+
+def parse_settlement(text):
+    """"@Alice tournée 2, @Bob café tout, @Chloé tout" → [(user_id, item, quantité)]
+
+    item None : tous les items dus ; quantité None : tout ce qui est dû.
+    Effacer toute une dette doit être demandé par « tout » : une ligne
+    sans quantité, ou une quantité sans item, est refusée.
+    Lève ValueError (message affichable) à la première ligne invalide :
+    rien n'est appliqué tant que le lot entier n'est pas lisible.
+    """
+    lines = []
+    for raw in LINE_SEPARATOR.split(text):
+        raw = raw.strip()
+        if not raw:
+            continue
+        match = LINE_PATTERN.match(raw)
+        if not match:
+            raise ValueError(f"ligne illisible : « {raw} » (attendu : @personne item quantité)")
+        user_id, token, amount = match.groups()
+        words = token.split()
+        if amount is None:
+            if not words or _normalize(words[-1]) not in ALL_WORDS:
+                raise ValueError(f"quantité manquante : « {raw} » (un nombre ou « tout »)")
+            words.pop()  # « café tout » : tout le café dû ; « tout » seul : tous les items
+        elif not words or _normalize(" ".join(words)) in ALL_WORDS:
+            raise ValueError(f"item manquant pour la quantité : « {raw} »")
+        elif int(amount) <= 0:
+            raise ValueError(f"quantité invalide : « {raw} »")
+        item = _match_item(" ".join(words)) if words else None
+        lines.append((int(user_id), item, int(amount) if amount else None))
+    if not lines:
+        raise ValueError("aucune ligne à acquitter")
+    return lines
+
+
+def resolve_settlement(store, requested):
+    """Lignes (user_id, item, quantité) à passer au store, fusionnées par (user_id, item)
+
+    Les quantités sont bornées par les totaux dus ; retourne aussi les
+    lignes demandées pour lesquelles rien n'est dû.
+    """
+    due = {}
+    nothing_due = {}  # (user_id, item) sans doublon, dans l'ordre des lignes
+    for user_id, item, amount in requested:
+        owed = store.totals_for(user_id)
+        items = [item] if item else list(owed)
+        if not any(owed.get(name) for name in items):
+            nothing_due[(user_id, item)] = None
+        for name in items:
+            key = (user_id, name)
+            wanted = owed.get(name, 0) if amount is None else due.get(key, 0) + amount
+            due[key] = min(wanted, owed.get(name, 0))
+    lines = [(user_id, item, amount) for (user_id, item), amount in due.items() if amount > 0]
+    return lines, list(nothing_due)
+
+
+def format_nothing_due(nothing_due, limit=FIELD_MAX_CHARS):
+    """« <@1> (Café), <@2> » tenant dans un field, avec le nombre de lignes omises"""
+    text = ""
+    for shown, (user_id, item) in enumerate(nothing_due):
+        part = f"<@{user_id}>" + (f" ({item})" if item else "")
+        # place gardée pour « … et N autre(s) »
+        if len(text) + len(part) + 2 > limit - 20:
+            return f"{text} … et {len(nothing_due) - shown} autre(s)"
+        text = f"{text}, {part}" if text else part
+    return text
 
 # ============================================================
 # MODAL : Commentaire
@@ -54,71 +130,57 @@ class FulfillModal(discord.ui.Modal, title="Ajouter un commentaire"):
         self.amount = amount
 
     async def on_submit(self, interaction: discord.Interaction):
-        ledger = load_ledger()
-
-        uid = str(self.user_id)
-        remaining = self.amount
-
-        # Décrémentation des dettes existantes
-        for entry in ledger.get(uid, []):
-            if entry["item"] != self.item:
-                continue
-
-            if remaining <= 0:
-                break
-
-            if entry["amount"] <= remaining:
-                remaining -= entry["amount"]
-                entry["amount"] = 0
-            else:
-                entry["amount"] -= remaining
-                remaining = 0
-
-        # Suppression des entrées soldées
-        ledger[uid] = [e for e in ledger.get(uid, []) if e["amount"] > 0]
-        
-        # Si l'utilisateur n'a plus aucune dette, supprimer sa clé du ledger
-        if not ledger[uid]:
-            del ledger[uid]
-        
-        save_ledger(ledger)
-
-        # Créer un embed pour l'acquittement
-        embed = discord.Embed(
-            title="✅ Tournée Acquittée !",
-            description=f"Cette tournée a été payée et retirée du grand livre",
-            color=discord.Color.green(),
-        )
-        
-        embed.add_field(
-            name="🙋 Victime",
-            value=f"<@{self.user_id}>",
-            inline=True
-        )
+        # Un acquittement à la fois par utilisateur : les messages publiés
+        # suivent l'ordre dans lequel les dettes ont été décrémentées
+        store = await interaction.client.stores.get(interaction.guild_id)
+        async with interaction.client.ledger_locks((interaction.guild_id, self.user_id)):
+            # Décrémentation des dettes existantes (les plus anciennes d'abord).
+            # Un autre acquittement a pu passer depuis l'ouverture du menu :
+            # on publie la quantité réellement acquittée
+            settled = store.settle(self.user_id, self.item, self.amount)
+            if not settled:
+                return await interaction.response.edit_message(
+                    content=f"⚠️ Plus rien à acquitter en {self.item} pour <@{self.user_id}>.",
+                    embed=None,
+                    view=None,
+                )
+
+            # Créer un embed pour l'acquittement
+            embed = discord.Embed(
+                title="✅ Tournée Acquittée !",
+                description=f"Cette tournée a été payée et retirée du grand livre",
+                color=discord.Color.green(),
+            )
         
-        embed.add_field(
-            name=f"{ICONS[self.item]} Item",
-            value=f"{self.item} ×{self.amount}",
-            inline=True
-        )
+            embed.add_field(
+                name="🙋 Victime",
+                value=f"<@{self.user_id}>",
+                inline=True
+            )
         
-        embed.add_field(
-            name="✅ Acquitté par",
-            value=f"<@{interaction.user.id}>",
-            inline=True
-        )
+            embed.add_field(
+                name=f"{ICONS[self.item]} Item",
+                value=f"{self.item} ×{settled}",
+                inline=True
+            )
         
-        if self.comment.value:
             embed.add_field(
-                name="💬 Commentaire",
-                value=self.comment.value,
-                inline=False
+                name="✅ Acquitté par",
+                value=f"<@{interaction.user.id}>",
+                inline=True
             )
         
-        embed.set_footer(text=f"Payé le {datetime.now().strftime('%d/%m/%Y à %H:%M')}")
+            if self.comment.value:
+                embed.add_field(
+                    name="💬 Commentaire",
+                    value=self.comment.value,
+                    inline=False
+                )
+        
+            embed.set_footer(text=f"Payé le {datetime.now().strftime('%d/%m/%Y à %H:%M')}")
         
-        # Envoyer un message public dans le canal
-        await interaction.channel.send(embed=embed)
+            # Envoyer un message public dans le canal
+            await interaction.channel.send(embed=embed)
         
         # Fermer le message éphémère
         await interaction.response.edit_message(
@@ -292,6 +354,7 @@ class FulfillCommand(commands.Cog):
         name="fulfill",
         description="Acquitter une ou plusieurs tournées",
     )
+    @app_commands.guild_only()
     @app_commands.describe(
         user="La personne qui acquitte la tournée",
     )
@@ -305,20 +368,16 @@ class FulfillCommand(commands.Cog):
         # Obligatoire avant followup
         await interaction.response.defer(ephemeral=True)
 
-        ledger = load_ledger()
-        uid = str(user.id)
+        # Totaux tenus à jour par le store : O(items), sans parcourir les entrées
+        store = await self.bot.stores.get(interaction.guild_id)
+        items_due = dict(store.totals_for(user.id))
 
-        if uid not in ledger or not ledger[uid]:
+        if not items_due:
             return await interaction.followup.send(
                 f"🎉 {user.mention} n'a aucune tournée à acquitter.",
                 ephemeral=True,
             )
 
-        items_due = {}
-        for entry in ledger[uid]:
-            item = entry["item"]
-            items_due[item] = items_due.get(item, 0) + entry["amount"]
-
         embed = discord.Embed(
             title="💸 Acquitter une tournée",
             description=f"Choisis l'item et la quantité à acquitter pour {user.mention}",
@@ -331,6 +390,72 @@ class FulfillCommand(commands.Cog):
             ephemeral=True,
         )
 
+    @app_commands.command(
+        name="fulfillbulk",
+        description="Acquitter plusieurs tournées d'un coup (plusieurs personnes et items)",
+    )
+    @app_commands.guild_only()
+    @app_commands.describe(
+        lignes="Ex : @Alice tournée 2, @Bob café tout, @Chloé tout (tout = toute la dette)",
+        commentaire="Commentaire (optionnel), ex : payé au bar",
+    )
+    async def fulfillbulk(
+        self,
+        interaction: discord.Interaction,
+        lignes: str,
+        commentaire: str = None,
+    ):
+        try:
+            requested = parse_settlement(lignes)
+        except ValueError as e:
+            return await interaction.response.send_message(f"⚠️ Rien n'a été acquitté : {e}.", ephemeral=True)
+
+        user_ids = {user_id for user_id, _, _ in requested}
+        if len(user_ids) > BULK_MAX_USERS:
+            return await interaction.response.send_message(
+                f"⚠️ Rien n'a été acquitté : {BULK_MAX_USERS} personnes maximum par acquittement groupé.",
+                ephemeral=True,
+            )
+
+        store = await self.bot.stores.get(interaction.guild_id)
+        # Verrous de toutes les personnes concernées : le lot est lu, appliqué
+        # et publié sans qu'un autre acquittement ou une validation s'intercale
+        async with self.bot.ledger_locks.many((interaction.guild_id, user_id) for user_id in user_ids):
+            lines, nothing_due = resolve_settlement(store, requested)
+            if not lines:
+                return await interaction.response.send_message(
+                    "🎉 Rien à acquitter pour ces lignes.",
+                    ephemeral=True,
+                )
+
+            # Une seule mutation du ledger (une seule écriture) pour tout le lot
+            settled = store.settle_many(lines)
+
+            summary = {}
+            for (user_id, item, _), amount in zip(lines, settled):
+                if amount:
+                    summary.setdefault(user_id, []).append(f"{ICONS.get(item, '❓')} {item} ×{amount}")
+
+            embed = discord.Embed(
+                title="✅ Acquittement Groupé !",
+                description="\n".join(f"🙋 <@{user_id}> : {', '.join(parts)}" for user_id, parts in summary.items()),
+                color=discord.Color.green(),
+            )
+            embed.add_field(name="🧾 Total", value=f"{sum(settled)} tournée(s) retirée(s) du grand livre", inline=True)
+            embed.add_field(name="✅ Acquitté par", value=f"<@{interaction.user.id}>", inline=True)
+            if nothing_due:
+                embed.add_field(
+                    name="⚠️ Rien à acquitter",
+                    value=format_nothing_due(nothing_due),
+                    inline=False,
+                )
+            if commentaire:
+                embed.add_field(name="💬 Commentaire", value=commentaire[:1024], inline=False)
+            embed.set_footer(text=f"Payé le {datetime.now().strftime('%d/%m/%Y à %H:%M')}")
+
+            # Un seul message public pour tout le lot
+            await interaction.response.send_message(embed=embed)
+
 # ============================================================
 # SETUP
 # ============================================================
@@ -0,0 +1,124 @@
+# interaction_trace.py
+
+import gzip
+import json
+import logging
+import os
+import time
+from datetime import datetime
+
+import discord
+
+TRACE_FILE = os.getenv("TRACE_FILE", "")  # vide : pas d'enregistrement
+TRACE_VERSION = 1
+
+log = logging.getLogger(__name__)
+
+
+def open_trace(path, mode):
+    """Ouvre une trace en texte, compressée si le nom finit par .gz"""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def _text_values(components):
+    """Valeurs des champs texte d'un modal soumis, dans l'ordre d'affichage"""
+    values = []
+    for component in components:
+        if "value" in component:
+            values.append(component["value"])
+        values += _text_values(component.get("components", []))
+        if "component" in component:
+            values += _text_values([component["component"]])
+    return values
+
+
+def _component_position(message, custom_id):
+    """(rangée, colonne) du composant cliqué dans le message, None si introuvable"""
+    for row_index, row in enumerate(getattr(message, "components", None) or []):
+        for column, child in enumerate(getattr(row, "children", [])):
+            if getattr(child, "custom_id", None) == custom_id:
+                return [row_index, column]
+    return None
+
+
+# ============================================================
+# 🔵 ENREGISTREMENT DES INTERACTIONS (opt-in)
+# ============================================================
+class TraceRecorder:
+    """Écrit chaque interaction et réaction reçue dans un fichier JSON lines
+
+    Une ligne par événement, clés courtes, temps relatif au démarrage
+    (secondes, à la milliseconde). Les IDs de composants générés par
+    discord.py changent à chaque vue : on garde leur position dans le
+    message. Les réactions sur une carte gardent l'ID de la proposition
+    pour être rejouées sur la carte recréée. Les raisons et commentaires
+    saisis sont enregistrés tels quels.
+    """
+
+    def __init__(self, bot, path):
+        self.bot = bot
+        self.path = path
+        self.events = 0
+        self._file = None
+        self._start = 0.0
+
+    def start(self):
+        """À appeler avant de charger les cogs : nos listeners passent avant les leurs"""
+        self._file = open_trace(self.path, "a")
+        self._start = time.monotonic()
+        self._write({"k": "start", "v": TRACE_VERSION, "at": datetime.now().isoformat(timespec="seconds")})
+        self.bot.add_listener(self.on_interaction, "on_interaction")
+        self.bot.add_listener(self.on_raw_reaction_add, "on_raw_reaction_add")
+        log.info("Recording interactions to %s", self.path)
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+            log.info("Recorded %d event(s) to %s", self.events, self.path)
+
+    def _write(self, record):
+        record = {"t": round(time.monotonic() - self._start, 3), **record}
+        self._file.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self.events += 1
+
+    async def on_interaction(self, interaction):
+        data = interaction.data or {}
+        record = {
+            "u": interaction.user.id,
+            "g": interaction.guild_id,
+            "c": interaction.channel_id,
+            "id": interaction.id,
+        }
+        if interaction.type == discord.InteractionType.application_command:
+            record["k"] = "slash"
+            record["n"] = data.get("name")
+            record["o"] = {opt["name"]: opt.get("value") for opt in data.get("options", [])}
+        elif interaction.type == discord.InteractionType.component:
+            record["k"] = "component"
+            record["pos"] = _component_position(interaction.message, data.get("custom_id"))
+            if "values" in data:
+                record["v"] = data["values"]
+        elif interaction.type == discord.InteractionType.modal_submit:
+            record["k"] = "modal"
+            record["v"] = _text_values(data.get("components", []))
+        else:
+            return
+        self._write(record)
+
+    async def on_raw_reaction_add(self, payload):
+        record = {
+            "k": "reaction",
+            "u": payload.user_id,
+            "g": payload.guild_id,
+            "c": payload.channel_id,
+            "m": payload.message_id,
+            "e": str(payload.emoji),
+        }
+        store = self.bot.stores.get_loaded(payload.guild_id)
+        proposal_id = store and store.find_proposal_by_message(payload.message_id)
+        if proposal_id:
+            record["p"] = proposal_id
+        self._write(record)
@@ -0,0 +1,59 @@
+# locks.py
+
+import asyncio
+from contextlib import AsyncExitStack, asynccontextmanager
+
+
+# ============================================================
+# 🔵 VERROUS PAR CLÉ
+# ============================================================
+class KeyedLock:
+    """Un asyncio.Lock par clé, créé à la demande et oublié dès qu'il est libre
+
+    async with bot.proposal_locks(proposal_id): ...
+
+    Deux tâches sur la même clé s'exécutent l'une après l'autre, deux clés
+    différentes n'attendent jamais l'une sur l'autre. Le dictionnaire ne
+    garde que les clés tenues ou attendues : sa taille reste bornée par le
+    nombre de tâches en cours.
+
+    Ordre d'acquisition quand il en faut deux : proposition puis utilisateur
+    (bot.proposal_locks puis bot.ledger_locks), jamais l'inverse. Plusieurs
+    clés d'un même dictionnaire se prennent avec many(), par ordre croissant.
+    """
+
+    def __init__(self):
+        self._slots = {}  # clé → [Lock, tâches qui le tiennent ou l'attendent]
+        self.waits = 0    # acquisitions qui ont dû attendre une autre tâche
+
+    def __len__(self):
+        return len(self._slots)
+
+    def locked(self, key):
+        slot = self._slots.get(key)
+        return slot is not None and slot[0].locked()
+
+    @asynccontextmanager
+    async def __call__(self, key):
+        slot = self._slots.get(key)
+        if slot is None:
+            slot = self._slots[key] = [asyncio.Lock(), 0]
+        elif slot[0].locked():
+            self.waits += 1
+        slot[1] += 1
+        try:
+            async with slot[0]:
+                yield
+        finally:
+            # Aussi en cas d'annulation pendant l'attente
+            slot[1] -= 1
+            if not slot[1]:
+                del self._slots[key]
+
+    @asynccontextmanager
+    async def many(self, keys):
+        """Tient les verrous de plusieurs clés, pris par ordre croissant (pas d'interblocage)"""
+        async with AsyncExitStack() as stack:
+            for key in sorted(set(keys)):
+                await stack.enter_async_context(self(key))
+            yield
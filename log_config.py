@@ -0,0 +1,56 @@
+# log_config.py
+
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+LOG_FORMAT = "%(asctime)s [%(levelname)s] %(name)s: %(message)s"
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Pose l'enregistrement tel quel dans la file
+
+    QueueHandler formate le message avant de l'enfiler ; ici le formatage
+    (message, date, traceback) est laissé au thread du QueueListener.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def parse_levels(spec):
+    """"module=NIVEAU,module=NIVEAU" → {module: NIVEAU}"""
+    levels = {}
+    for part in spec.split(","):
+        name, _, level = part.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging(stream=None, level=None, levels=None):
+    """Branche tous les loggers sur une file vidée par un thread dédié
+
+    La boucle asyncio ne fait qu'enfiler les enregistrements : aucune
+    écriture sur stdout ne la bloque. Niveaux lus dans LOG_LEVEL (global,
+    INFO par défaut) et LOG_LEVELS, par module, ex.
+    "dashboard_command=DEBUG,add_command=WARNING". Retourne le
+    QueueListener, à arrêter à la fermeture pour écrire les derniers messages.
+    """
+    level = level or os.getenv("LOG_LEVEL", "INFO")
+    levels = levels if levels is not None else os.getenv("LOG_LEVELS", "")
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.handlers[:] = [DeferredQueueHandler(log_queue)]
+    root.setLevel(level.upper())
+    for name, module_level in parse_levels(levels).items():
+        logging.getLogger(name).setLevel(module_level)
+
+    listener.start()
+    return listener
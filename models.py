@@ -0,0 +1,131 @@
+# models.py
+
+import sys
+from dataclasses import dataclass, field
+
+# ============================================================
+# 🔵 CODES DES ITEMS
+# ============================================================
+# Chaque nom d'item n'est gardé qu'une fois : les entrées stockent son code
+# (petit entier, partagé par CPython) au lieu de leur propre copie du nom.
+ITEM_NAMES = []
+ITEM_CODES = {}
+
+
+def item_code(name):
+    """Code de l'item, attribué à la première apparition du nom"""
+    code = ITEM_CODES.get(name)
+    if code is None:
+        code = ITEM_CODES[name] = len(ITEM_NAMES)
+        ITEM_NAMES.append(name)
+    return code
+
+
+# json.load crée un objet par valeur lue : les IDs des auteurs et les raisons
+# qui reviennent d'une entrée à l'autre sont partagés au chargement.
+_SHARED_IDS = {}
+
+
+def _shared_id(user_id):
+    return _SHARED_IDS.setdefault(user_id, user_id)
+
+
+def _shared_text(text):
+    return sys.intern(text) if text else text
+
+
+# ============================================================
+# 🔵 ENTRÉE DU GRAND LIVRE
+# ============================================================
+@dataclass(slots=True)
+class LedgerEntry:
+    """Une tournée due ; sérialisée comme avant : {"item", "amount", "reason", "added_by"}"""
+
+    code: int
+    amount: int
+    reason: str = None
+    added_by: int = None
+    # Rang d'ajout parmi les entrées de l'utilisateur (en mémoire seulement) :
+    # le store range les entrées par item et s'en sert pour retrouver leur ordre
+    seq: int = field(default=0, compare=False, repr=False)
+
+    @classmethod
+    def new(cls, item, amount, reason=None, added_by=None):
+        return cls(item_code(item), amount, _shared_text(reason), _shared_id(added_by))
+
+    @classmethod
+    def from_json(cls, data):
+        return cls.new(data["item"], data["amount"], data.get("reason"), data.get("added_by"))
+
+    @property
+    def item(self):
+        return ITEM_NAMES[self.code]
+
+    def to_json(self):
+        return {"item": self.item, "amount": self.amount, "reason": self.reason, "added_by": self.added_by}
+
+
+# ============================================================
+# 🔵 PROPOSITION EN ATTENTE
+# ============================================================
+@dataclass(slots=True)
+class Proposal:
+    """Une proposition en attente de votes ; `votes` est un set d'IDs (liste en JSON)
+
+    Proposition de groupe : `user_ids` liste toutes les victimes (la
+    première est aussi dans `user_id`), None pour une seule victime.
+    """
+
+    user_id: int
+    code: int
+    amount: int
+    reason: str = None
+    added_by: int = None
+    timestamp: str = None
+    expires_at: str = None
+    votes: set = field(default_factory=set)
+    message_id: int = None
+    channel_id: int = None
+    user_ids: list = None
+
+    @classmethod
+    def new(cls, user_id, item, amount, **fields):
+        return cls(user_id, item_code(item), amount, **fields)
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(
+            data["user_id"], item_code(data["item"]), data["amount"],
+            data.get("reason"), data.get("added_by"), data.get("timestamp"), data.get("expires_at"),
+            set(data.get("votes", ())), data.get("message_id"), data.get("channel_id"),
+            data.get("user_ids"),
+        )
+
+    @property
+    def item(self):
+        return ITEM_NAMES[self.code]
+
+    @property
+    def victims(self):
+        return self.user_ids or [self.user_id]
+
+    def update(self, **changes):
+        for name, value in changes.items():
+            setattr(self, name, value)
+
+    def to_json(self):
+        data = {
+            "user_id": self.user_id,
+            "item": self.item,
+            "amount": self.amount,
+            "reason": self.reason,
+            "added_by": self.added_by,
+            "timestamp": self.timestamp,
+            "expires_at": self.expires_at,
+            "votes": sorted(self.votes),
+            "message_id": self.message_id,
+            "channel_id": self.channel_id,
+        }
+        if self.user_ids:
+            data["user_ids"] = self.user_ids
+        return data
@@ -0,0 +1,243 @@
+# pagination.py
+
+import os
+from collections import OrderedDict, namedtuple
+
+import discord
+
+MAX_EMBED_CHARS = 6000  # Limite Discord : titre + description + fields + footer
+MAX_EMBED_FIELDS = 25   # Limite Discord
+FOOTER_RESERVE = 100    # place gardée pour le footer, posé après le remplissage
+CONTINUED = " (suite)"
+RENDER_CACHE_SIZE = int(os.getenv("RENDER_CACHE_SIZE", "32"))  # (commande, filtre) gardés en cache
+
+# Une section = un header optionnel (name, value) suivi de ses fields (name, value, inline)
+Section = namedtuple("Section", ["header", "fields"])
+
+
+def field_size(name, value):
+    """Taille comptée par Discord pour un field"""
+    return len(name) + len(value)
+
+
+# ============================================================
+# 🔵 REMPLISSAGE DES PAGES AU PLUS PRÈS DES LIMITES
+# ============================================================
+class EmbedPacker:
+    """Remplit chaque page avec le plus de fields possible
+
+    Les tailles sont celles du texte réellement rendu (mentions et noms
+    déjà résolus par `get_section`). Une section trop longue pour la fin
+    de la page continue sur la suivante, derrière son header suivi de
+    "(suite)". Le curseur d'une page est (index de section, index de field).
+    """
+
+    def __init__(self, make_embed, get_section, count):
+        self.make_embed = make_embed    # () → embed vide (titre, description)
+        self.get_section = get_section  # index → Section, ou None pour l'ignorer
+        self.count = count
+
+    def fill_page(self, cursor):
+        """Retourne (embed, curseur de la page suivante ou None)"""
+        index, offset = cursor
+        embed = self.make_embed()
+        size = len(embed) + FOOTER_RESERVE
+
+        def fits(*fields):
+            return (
+                len(embed.fields) + len(fields) <= MAX_EMBED_FIELDS
+                and size + sum(field_size(name, value) for name, value, _ in fields) <= MAX_EMBED_CHARS
+            )
+
+        while index < self.count:
+            section = self.get_section(index)
+            if section is None:
+                index, offset = index + 1, 0
+                continue
+
+            remaining = section.fields[offset:]
+            if section.header:
+                name, value = section.header
+                if offset:
+                    value = value.rstrip("\n") + CONTINUED
+                # Un header n'est jamais laissé seul en bas de page
+                opening = [(name, value, False)] + remaining[:1]
+                if embed.fields and not fits(*opening):
+                    return embed, (index, offset)
+                embed.add_field(name=name, value=value, inline=False)
+                size += field_size(name, value)
+
+            for field in remaining:
+                if embed.fields and not fits(field):
+                    return embed, (index, offset)
+                name, value, inline = field
+                embed.add_field(name=name, value=value, inline=inline)
+                size += field_size(name, value)
+                offset += 1
+
+            index, offset = index + 1, 0
+
+        return embed, None
+
+
+# ============================================================
+# 🔵 CACHE DES PAGES RENDUES (versionné)
+# ============================================================
+class RenderCache:
+    """Contenu des pages déjà rendues, par (commande, filtre, version du store)
+
+    Seuls les fields et les bornes des pages sont gardés : l'embed est
+    reconstruit à chaque affichage pour que footer et date restent à jour.
+    Une nouvelle version du store rend les pages précédentes obsolètes :
+    elles sont remplacées dès qu'une page de la nouvelle version est rendue.
+    """
+
+    def __init__(self, max_size=RENDER_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # (commande, filtre) → (version, {curseur: (fields, fin)})
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "size": len(self._entries),
+        }
+
+    def _pages(self, key, version):
+        """Pages en cache pour cette version, None si une version plus récente existe"""
+        cached = self._entries.get(key)
+        if cached is not None and cached[0] > version:
+            return None  # vue ouverte avant une modification : pas de cache
+        if cached is None or cached[0] < version:
+            cached = (version, {})
+            self._entries[key] = cached
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return cached[1]
+
+    def wrap(self, command, filter, version, make_embed, fill_page):
+        """Enveloppe fill_page : une page déjà rendue pour cette version n'est pas reconstruite"""
+        key = (command, filter)
+
+        def cached_fill_page(cursor):
+            pages = self._pages(key, version)
+            if pages is None:
+                return fill_page(cursor)
+
+            hit = pages.get(cursor)
+            if hit is None:
+                self.misses += 1
+                embed, end = fill_page(cursor)
+                pages[cursor] = ([(f.name, f.value, f.inline) for f in embed.fields], end)
+                return embed, end
+
+            self.hits += 1
+            fields, end = hit
+            embed = make_embed()
+            for name, value, inline in fields:
+                embed.add_field(name=name, value=value, inline=inline)
+            return embed, end
+
+        return cached_fill_page
+
+
+# ============================================================
+# 🔵 PAGES CALCULÉES À LA DEMANDE
+# ============================================================
+class LazyPages:
+    """Pages construites à la demande à partir d'un curseur dans la source
+
+    `fill_page(curseur)` construit la page qui commence à ce curseur et
+    retourne (embed, curseur suivant ou None en fin de source). On ne
+    garde que les curseurs des pages déjà visitées : seule la page
+    affichée existe en mémoire.
+    """
+
+    def __init__(self, fill_page, first=(0, 0)):
+        self.fill_page = fill_page
+        self.starts = [first]
+        self.total = None  # connu une fois la dernière page atteinte
+
+    def render(self, page):
+        embed, end = self.fill_page(self.starts[page])
+        if page + 1 == len(self.starts):
+            if end is None:
+                self.total = page + 1
+            else:
+                self.starts.append(end)
+        return embed
+
+    def has_next(self, page):
+        """Valable après render(page)"""
+        return page + 1 < len(self.starts)
+
+    def page_label(self, page):
+        return f"Page {page + 1}/{self.total}" if self.total else f"Page {page + 1}"
+
+
+# ============================================================
+# 🔵 PAGINATION VIEW (boutons)
+# ============================================================
+class PaginatedView(discord.ui.View):
+    """Boutons ◀️ / ▶️ / Fermer au-dessus d'un LazyPages
+
+    Les sous-classes personnalisent le footer via footer_text().
+    """
+
+    def __init__(self, pages, user):
+        super().__init__(timeout=90)
+        self.pages = pages
+        self.page = 0
+        self.user = user
+
+    def update_buttons(self):
+        """Active/désactive les boutons selon la page actuelle"""
+        self.children[0].disabled = (self.page == 0)  # Bouton précédent
+        self.children[1].disabled = not self.pages.has_next(self.page)  # Bouton suivant
+
+    def footer_text(self):
+        return self.pages.page_label(self.page)
+
+    def render(self):
+        """Construit la page courante, son footer et l'état des boutons"""
+        embed = self.pages.render(self.page)
+        self.update_buttons()
+        embed.set_footer(text=self.footer_text())
+        return embed
+
+    async def update_message(self, interaction):
+        embed = self.render()
+        await interaction.response.edit_message(embed=embed, view=self)
+
+    @discord.ui.button(label="◀️", style=discord.ButtonStyle.primary)
+    async def previous(self, interaction, button):
+        if interaction.user.id != self.user.id:
+            return await interaction.response.send_message(
+                "❌ Tu ne peux pas utiliser ces boutons.", ephemeral=True
+            )
+        if self.page > 0:
+            self.page -= 1
+        await self.update_message(interaction)
+
+    @discord.ui.button(label="▶️", style=discord.ButtonStyle.primary)
+    async def next(self, interaction, button):
+        if interaction.user.id != self.user.id:
+            return await interaction.response.send_message(
+                "❌ Tu ne peux pas utiliser ces boutons.", ephemeral=True
+            )
+        if self.pages.has_next(self.page):
+            self.page += 1
+        await self.update_message(interaction)
+
+    @discord.ui.button(label="🗑️ Fermer", style=discord.ButtonStyle.danger)
+    async def close(self, interaction, button):
+        if interaction.user.id != self.user.id:
+            return await interaction.response.send_message(
+                "❌ Tu ne peux pas utiliser ces boutons.", ephemeral=True
+            )
+        await interaction.response.edit_message(content="Dashboard fermé.", embed=None, view=None)
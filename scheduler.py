@@ -0,0 +1,179 @@
+# scheduler.py
+
+import asyncio
+import heapq
+import logging
+import time
+
+log = logging.getLogger(__name__)
+
+
+# ============================================================
+# 🔵 ÉCHÉANCIER D'EXPIRATION (tas min)
+# ============================================================
+class ExpirationScheduler:
+    """Une seule tâche qui se réveille à la prochaine échéance
+
+    `callback` reçoit la liste des IDs arrivés à échéance et les traite en
+    un seul lot. Une annulation retire juste l'ID du dictionnaire des
+    échéances ; l'entrée correspondante du tas est ignorée quand elle
+    ressort, et le tas est reconstruit quand ces entrées mortes dominent.
+    """
+
+    def __init__(self, callback):
+        self.callback = callback
+        self._heap = []        # (timestamp, proposal_id)
+        self._deadlines = {}   # proposal_id → timestamp, seule source de vérité
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def schedule(self, proposal_id, expires_at):
+        """Programme (ou reprogramme) l'expiration d'une proposition (datetime)"""
+        deadline = expires_at.timestamp()
+        self._deadlines[proposal_id] = deadline
+        heapq.heappush(self._heap, (deadline, proposal_id))
+        self._compact()
+        # Réveiller la boucle si cette échéance devient la plus proche
+        if self._heap[0] == (deadline, proposal_id):
+            self._wakeup.set()
+
+    def cancel(self, proposal_id):
+        """Désinscrit une proposition validée ou supprimée"""
+        self._deadlines.pop(proposal_id, None)
+        self._compact()
+
+    def _compact(self):
+        if len(self._heap) > 64 and len(self._heap) > 2 * len(self._deadlines):
+            self._heap = [(d, pid) for pid, d in self._deadlines.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_due(self, now):
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, proposal_id = heapq.heappop(self._heap)
+            # Entrée morte : annulée ou reprogrammée depuis
+            if self._deadlines.get(proposal_id) != deadline:
+                continue
+            del self._deadlines[proposal_id]
+            due.append(proposal_id)
+        return due
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            due = self._pop_due(time.time())
+            if due:
+                try:
+                    await self.callback(due)
+                except Exception:
+                    log.exception("Expiration batch failed")
+                continue
+
+            timeout = self._heap[0][0] - time.time() if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+
+# ============================================================
+# 🔵 BOUCLE DE RAFRAÎCHISSEMENT DES COMPTES À REBOURS
+# ============================================================
+class RefreshLoop:
+    """Une seule boucle qui réédite les messages dont le texte affiché a changé
+
+    À chaque tour, `render_all()` donne le texte attendu pour chaque clé.
+    Les clés dont le texte affiché est identique sont sautées ; les autres
+    sont passées à `edit(key)`, réparties sur l'intervalle et limitées à
+    `budget` éditions par tour. `edit` recalcule le texte au moment de
+    l'envoi et le retourne (None si la clé a disparu). Les éditions hors
+    budget sont reprises au tour suivant puisque leur texte reste différent.
+    """
+
+    def __init__(self, render_all, edit, interval=60, budget=30):
+        self.render_all = render_all
+        self.edit = edit
+        self.interval = interval
+        self.budget = budget
+        self.last_report = {"edits": 0, "skipped": 0, "deferred": 0}
+        self._displayed = {}  # clé → dernier texte envoyé
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def mark_displayed(self, key, text):
+        """À appeler quand le message a été édité ailleurs (vote, création...)"""
+        self._displayed[key] = text
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            tick_start = loop.time()
+            try:
+                await self._tick(tick_start)
+            except Exception:
+                log.exception("Refresh loop tick failed")
+            await asyncio.sleep(max(0, tick_start + self.interval - loop.time()))
+
+    async def _tick(self, tick_start):
+        loop = asyncio.get_running_loop()
+        expected = dict(self.render_all())
+
+        # Oublier les clés disparues (propositions validées / expirées)
+        self._displayed = {k: v for k, v in self._displayed.items() if k in expected}
+
+        changed = [(k, text) for k, text in expected.items() if self._displayed.get(k) != text]
+        to_send = changed[:self.budget]
+        spacing = self.interval / max(len(to_send), 1)
+
+        edits = 0
+        for i, (key, text) in enumerate(to_send):
+            await asyncio.sleep(max(0, tick_start + i * spacing - loop.time()))
+            if self._displayed.get(key) == text:
+                continue  # déjà mis à jour entre-temps (vote...)
+            try:
+                sent = await self.edit(key)
+                if sent is not None:
+                    self._displayed[key] = sent
+                    edits += 1
+            except Exception as e:
+                log.error("Could not refresh %s: %s", key, e)
+                # On ne réessaie que si le texte change à nouveau
+                self._displayed[key] = text
+
+        self.last_report = {
+            "edits": edits,
+            "skipped": len(expected) - len(changed),
+            "deferred": len(changed) - len(to_send),
+        }
+        log.debug(
+            "Refresh loop: %d edit(s), %d skipped, %d deferred",
+            edits, self.last_report["skipped"], self.last_report["deferred"],
+        )
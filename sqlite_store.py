@@ -0,0 +1,371 @@
+# sqlite_store.py
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import sys
+
+from models import LedgerEntry, Proposal
+from storage import LEDGER_FILE, PENDING_FILE, _load_json, _next_version
+
+log = logging.getLogger(__name__)
+
+SQLITE_FILE = os.getenv("SQLITE_FILE", "tournees.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ledger (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    item TEXT NOT NULL,
+    amount INTEGER NOT NULL,
+    reason TEXT,
+    added_by INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_ledger_user_item ON ledger (user_id, item);
+
+CREATE TABLE IF NOT EXISTS totals (
+    user_id TEXT NOT NULL,
+    item TEXT NOT NULL,
+    amount INTEGER NOT NULL,
+    PRIMARY KEY (user_id, item)
+);
+
+CREATE TABLE IF NOT EXISTS pending (
+    proposal_id TEXT PRIMARY KEY,
+    user_id INTEGER NOT NULL,
+    item TEXT NOT NULL,
+    amount INTEGER NOT NULL,
+    reason TEXT,
+    added_by INTEGER,
+    timestamp TEXT,
+    expires_at TEXT,
+    votes TEXT NOT NULL DEFAULT '[]',
+    message_id INTEGER,
+    channel_id INTEGER,
+    user_ids TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_pending_message ON pending (message_id);
+CREATE INDEX IF NOT EXISTS idx_pending_expires ON pending (expires_at);
+"""
+
+PENDING_COLUMNS = (
+    "user_id", "item", "amount", "reason", "added_by",
+    "timestamp", "expires_at", "votes", "message_id", "channel_id", "user_ids",
+)
+
+# Colonnes de pending stockées en JSON
+JSON_COLUMNS = ("votes", "user_ids")
+
+
+def _row_to_entry(row):
+    return LedgerEntry.new(row["item"], row["amount"], row["reason"], row["added_by"])
+
+
+def _row_to_proposal(row):
+    data = {col: row[col] for col in PENDING_COLUMNS}
+    data["votes"] = json.loads(data["votes"])
+    if data["user_ids"]:
+        data["user_ids"] = json.loads(data["user_ids"])
+    return Proposal.from_json(data)
+
+
+def _pending_values(data):
+    """Valeurs des colonnes de pending pour une proposition sérialisée"""
+    return [
+        json.dumps(data[col]) if col in JSON_COLUMNS and data.get(col) is not None else data.get(col)
+        for col in PENDING_COLUMNS
+    ]
+
+
+# ============================================================
+# 🔵 STORE SQLITE (WAL)
+# ============================================================
+class SQLiteStore:
+    """Même interface que JsonStore, adossée à une base SQLite indexée"""
+
+    def __init__(self, db_file=SQLITE_FILE):
+        self.db_file = db_file
+        self.db = None
+        self.version = _next_version()  # change à chaque modification du ledger (cache des dashboards)
+        self._by_message = {}  # message_id → proposal_id, pour filtrer les réactions sans requête
+        self._by_target = {}   # (victime, item) → proposal_id de la dernière proposition individuelle
+
+    # ---------- cycle de vie ----------
+
+    def load(self):
+        # Ouverte dans le thread de start(), utilisée ensuite depuis la boucle (jamais en parallèle)
+        self.db = sqlite3.connect(self.db_file, check_same_thread=False)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self._migrate()
+        self._index_pending()
+        self._check_totals()
+
+    def read_pending(self):
+        """Propositions en attente, sans vérifier les agrégats du ledger (store non démarré)"""
+        if not os.path.exists(self.db_file):
+            return []
+        self.db = sqlite3.connect(self.db_file)
+        self.db.row_factory = sqlite3.Row
+        try:
+            self._migrate()
+            return self.pending_items()
+        finally:
+            self.db.close()
+            self.db = None
+
+    def _migrate(self):
+        """Ajoute aux bases existantes les colonnes apparues depuis leur création"""
+        columns = {row["name"] for row in self.db.execute("PRAGMA table_info(pending)")}
+        if "user_ids" not in columns:
+            with self.db:
+                self.db.execute("ALTER TABLE pending ADD COLUMN user_ids TEXT")
+
+    def _check_totals(self):
+        """Recalcule les agrégats s'ils ne correspondent plus au ledger"""
+        ledger_sum = self.db.execute("SELECT COALESCE(SUM(amount), 0) FROM ledger").fetchone()[0]
+        totals_sum = self.db.execute("SELECT COALESCE(SUM(amount), 0) FROM totals").fetchone()[0]
+        if ledger_sum != totals_sum:
+            log.warning("Totals out of sync with the ledger, rebuilding them")
+            self.rebuild_totals()
+
+    def rebuild_totals(self):
+        """Recalcule tous les agrégats depuis le ledger (à la demande)"""
+        with self.db:
+            self.db.execute("DELETE FROM totals")
+            self.db.execute(
+                "INSERT INTO totals (user_id, item, amount) "
+                "SELECT user_id, item, SUM(amount) FROM ledger GROUP BY user_id, item"
+            )
+        self.version = _next_version()
+
+    def _index_pending(self):
+        self._by_message = dict(
+            self.db.execute("SELECT message_id, proposal_id FROM pending WHERE message_id IS NOT NULL").fetchall()
+        )
+        self._by_target = {
+            (row["user_id"], row["item"]): row["proposal_id"]
+            for row in self.db.execute(
+                "SELECT proposal_id, user_id, item FROM pending WHERE user_ids IS NULL ORDER BY rowid"
+            )
+        }
+
+    async def start(self):
+        # Ouverture et vérification des agrégats hors de la boucle
+        await asyncio.to_thread(self.load)
+
+    async def close(self):
+        if self.db:
+            self.db.close()
+            self.db = None
+
+    async def flush(self):
+        """Chaque opération est déjà committée, rien à écrire"""
+
+    # ---------- ledger ----------
+
+    def ledger_items(self):
+        ledger = {}
+        for row in self.db.execute("SELECT * FROM ledger ORDER BY id"):
+            ledger.setdefault(row["user_id"], []).append(_row_to_entry(row))
+        return ledger.items()
+
+    def ledger_user_ids(self):
+        """IDs des utilisateurs présents dans le ledger, dans l'ordre de leur première entrée"""
+        rows = self.db.execute("SELECT user_id FROM ledger GROUP BY user_id ORDER BY MIN(id)")
+        return [row["user_id"] for row in rows]
+
+    def user_entries(self, user_id):
+        rows = self.db.execute("SELECT * FROM ledger WHERE user_id = ? ORDER BY id", (str(user_id),))
+        return [_row_to_entry(row) for row in rows]
+
+    def user_totals(self):
+        totals = {}
+        for row in self.db.execute("SELECT user_id, item, amount FROM totals ORDER BY rowid"):
+            totals.setdefault(row["user_id"], {})[row["item"]] = row["amount"]
+        return totals.items()
+
+    def totals_for(self, user_id):
+        rows = self.db.execute("SELECT item, amount FROM totals WHERE user_id = ? ORDER BY rowid", (str(user_id),))
+        return {row["item"]: row["amount"] for row in rows}
+
+    def grand_totals(self):
+        rows = self.db.execute("SELECT item, SUM(amount) AS amount FROM totals GROUP BY item")
+        return {row["item"]: row["amount"] for row in rows}
+
+    def _add_to_totals(self, user_id, item, delta):
+        self.db.execute(
+            "INSERT INTO totals (user_id, item, amount) VALUES (?, ?, ?) "
+            "ON CONFLICT (user_id, item) DO UPDATE SET amount = amount + excluded.amount",
+            (user_id, item, delta),
+        )
+        self.db.execute("DELETE FROM totals WHERE user_id = ? AND item = ? AND amount <= 0", (user_id, item))
+
+    def add_entry(self, user_id, entry):
+        with self.db:
+            self._add_entry(user_id, entry)
+        self.version = _next_version()
+
+    def add_entries(self, lines):
+        """Ajoute plusieurs tournées (user_id, entrée) dans une seule transaction"""
+        with self.db:
+            for user_id, entry in lines:
+                self._add_entry(user_id, entry)
+        self.version = _next_version()
+
+    def _add_entry(self, user_id, entry):
+        """Corps de add_entry(), à appeler dans une transaction"""
+        self.db.execute(
+            "INSERT INTO ledger (user_id, item, amount, reason, added_by) VALUES (?, ?, ?, ?, ?)",
+            (str(user_id), entry.item, entry.amount, entry.reason, entry.added_by),
+        )
+        self._add_to_totals(str(user_id), entry.item, entry.amount)
+
+    def settle(self, user_id, item, amount):
+        """Acquitte `amount` unités de `item`, des plus anciennes aux plus récentes
+
+        Retourne la quantité réellement acquittée (bornée par la dette restante).
+        """
+        with self.db:
+            settled = self._settle(user_id, item, amount)
+        if settled:
+            self.version = _next_version()
+        return settled
+
+    def settle_many(self, lines):
+        """Acquitte plusieurs lignes (user_id, item, quantité) dans une seule transaction"""
+        with self.db:
+            settled = [self._settle(user_id, item, amount) for user_id, item, amount in lines]
+        if any(settled):
+            self.version = _next_version()
+        return settled
+
+    def _settle(self, user_id, item, amount):
+        """Corps de settle(), à appeler dans une transaction"""
+        remaining = amount
+        rows = self.db.execute(
+            "SELECT id, amount FROM ledger WHERE user_id = ? AND item = ? ORDER BY id",
+            (str(user_id), item),
+        ).fetchall()
+        for row in rows:
+            if remaining <= 0:
+                break
+            if row["amount"] <= remaining:
+                remaining -= row["amount"]
+                self.db.execute("DELETE FROM ledger WHERE id = ?", (row["id"],))
+            else:
+                self.db.execute("UPDATE ledger SET amount = ? WHERE id = ?", (row["amount"] - remaining, row["id"]))
+                remaining = 0
+        if amount > remaining:
+            self._add_to_totals(str(user_id), item, remaining - amount)
+        return amount - remaining
+
+    # ---------- pending ----------
+
+    def pending_items(self):
+        rows = self.db.execute("SELECT * FROM pending ORDER BY rowid")
+        return [(row["proposal_id"], _row_to_proposal(row)) for row in rows]
+
+    def get_proposal(self, proposal_id):
+        row = self.db.execute("SELECT * FROM pending WHERE proposal_id = ?", (proposal_id,)).fetchone()
+        return _row_to_proposal(row) if row else None
+
+    def add_proposal(self, proposal_id, entry):
+        values = _pending_values(entry.to_json())
+        with self.db:
+            self.db.execute(
+                f"INSERT OR REPLACE INTO pending (proposal_id, {', '.join(PENDING_COLUMNS)}) "
+                f"VALUES (?, {', '.join('?' * len(PENDING_COLUMNS))})",
+                (proposal_id, *values),
+            )
+        if entry.message_id:
+            self._by_message[entry.message_id] = proposal_id
+        if not entry.user_ids:
+            self._by_target[(entry.user_id, entry.item)] = proposal_id
+
+    def update_proposal(self, proposal_id, **changes):
+        if "votes" in changes:
+            changes["votes"] = json.dumps(sorted(changes["votes"]))
+        assignments = ", ".join(f"{col} = ?" for col in changes)
+        with self.db:
+            self.db.execute(
+                f"UPDATE pending SET {assignments} WHERE proposal_id = ?",
+                (*changes.values(), proposal_id),
+            )
+        if changes.get("message_id"):
+            self._by_message[changes["message_id"]] = proposal_id
+
+    def add_vote(self, proposal_id, user_id):
+        """Ajoute un vote, retourne False si l'utilisateur a déjà voté"""
+        with self.db:
+            row = self.db.execute("SELECT votes FROM pending WHERE proposal_id = ?", (proposal_id,)).fetchone()
+            votes = json.loads(row["votes"])
+            if user_id in votes:
+                return False
+            votes.append(user_id)
+            self.db.execute("UPDATE pending SET votes = ? WHERE proposal_id = ?", (json.dumps(votes), proposal_id))
+        return True
+
+    def remove_proposal(self, proposal_id, status=None):
+        with self.db:
+            row = self.db.execute(
+                "SELECT message_id, user_id, item FROM pending WHERE proposal_id = ?", (proposal_id,)
+            ).fetchone()
+            self.db.execute("DELETE FROM pending WHERE proposal_id = ?", (proposal_id,))
+        if row:
+            self._by_message.pop(row["message_id"], None)
+            if self._by_target.get((row["user_id"], row["item"])) == proposal_id:
+                del self._by_target[(row["user_id"], row["item"])]
+
+    def find_proposal_by_message(self, message_id):
+        """Retourne l'ID de la proposition liée à ce message, ou None (sans requête)"""
+        return self._by_message.get(message_id)
+
+    def find_proposal_for(self, user_id, item):
+        """Dernière proposition individuelle ouverte pour (victime, item), ou None (sans requête)"""
+        return self._by_target.get((user_id, item))
+
+    # ---------- import ----------
+
+    def import_json(self, ledger_file=LEDGER_FILE, pending_file=PENDING_FILE):
+        """Import unique de ledger.json / pending.json dans une base vide"""
+        has_rows = self.db.execute(
+            "SELECT EXISTS (SELECT 1 FROM ledger) OR EXISTS (SELECT 1 FROM pending)"
+        ).fetchone()[0]
+        if has_rows:
+            raise RuntimeError(f"{self.db_file} contient déjà des données, import annulé")
+
+        ledger = _load_json(ledger_file)
+        pending = _load_json(pending_file)
+        with self.db:
+            self.db.executemany(
+                "INSERT INTO ledger (user_id, item, amount, reason, added_by) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (uid, e["item"], e["amount"], e.get("reason"), e.get("added_by"))
+                    for uid, entries in ledger.items()
+                    for e in entries
+                ],
+            )
+            self.db.executemany(
+                f"INSERT INTO pending (proposal_id, {', '.join(PENDING_COLUMNS)}) "
+                f"VALUES (?, {', '.join('?' * len(PENDING_COLUMNS))})",
+                [
+                    (pid, *_pending_values(p))
+                    for pid, p in pending.items()
+                ],
+            )
+        self._index_pending()
+        self.rebuild_totals()
+        return sum(len(entries) for entries in ledger.values()), len(pending)
+
+
+if __name__ == "__main__":
+    # Usage : python sqlite_store.py [ledger.json] [pending.json]
+    store = SQLiteStore()
+    store.load()
+    ledger_count, pending_count = store.import_json(*sys.argv[1:3])
+    print(f"{ledger_count} entrée(s) et {pending_count} proposition(s) importées dans {store.db_file}")
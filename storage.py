@@ -0,0 +1,889 @@
+# storage.py
+
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import os
+import time
+from collections import deque
+from functools import partial
+from operator import attrgetter
+
+from models import LedgerEntry, Proposal, item_code
+
+LEDGER_FILE = "ledger.json"
+PENDING_FILE = "pending.json"
+TOTALS_FILE = "totals.json"
+SNAPSHOT_FILE = "snapshot.json"
+JOURNAL_FILE = "journal.jsonl"
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json")  # "json", "journal" ou "sqlite"
+DATA_DIR = os.getenv("DATA_DIR", "data")  # un sous-dossier de fichiers par serveur
+LEGACY_GUILD_ID = os.getenv("LEGACY_GUILD_ID")  # serveur qui reprend les fichiers d'avant le partitionnement
+GUILD_IDLE_TIMEOUT = float(os.getenv("GUILD_IDLE_TIMEOUT", "900"))  # secondes sans activité avant de fermer un serveur
+GUILD_EVICT_INTERVAL = 60  # secondes entre deux recherches de serveurs inactifs
+WRITE_BEHIND_INTERVAL = float(os.getenv("WRITE_BEHIND_INTERVAL", "5"))  # secondes entre deux écritures disque
+JOURNAL_COMPACT_INTERVAL = float(os.getenv("JOURNAL_COMPACT_INTERVAL", "300"))  # secondes entre deux snapshots
+COPY_CHUNK = 5000  # entrées copiées entre deux passages de main à la boucle
+
+log = logging.getLogger(__name__)
+
+# Versions tirées d'un compteur commun à tous les stores : un serveur fermé
+# puis rouvert ne revient jamais à une version déjà vue par le cache des dashboards
+_next_version = itertools.count(1).__next__
+
+
+def _read_json(f):
+    """json.load qui laisse tourner la boucle quand il est appelé depuis un thread
+
+    Le parseur C garde le GIL pendant tout le fichier ; un object_hook en
+    Python, appelé à chaque objet, lui donne l'occasion de le rendre.
+    """
+    return json.load(f, object_hook=lambda obj: obj)
+
+
+def _load_json(path):
+    if not os.path.exists(path):
+        with open(path, "w") as f:
+            json.dump({}, f)
+    with open(path, "r") as f:
+        return _read_json(f)
+
+
+def _save_json(path, data):
+    """Écriture atomique : fichier temporaire, fsync puis rename"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        # json.dump (contrairement à json.dumps) encode par morceaux en Python pur :
+        # le GIL est relâché régulièrement et la boucle asyncio continue de tourner
+        json.dump(data, f, indent=4)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _file_stamp(path):
+    """[taille, date de modification] d'un fichier : change à chaque réécriture"""
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+# En mémoire, le ledger range les dettes de chaque utilisateur par item :
+# user_id → {code de l'item: deque des entrées, de la plus ancienne à la plus récente}.
+# Sur disque, chaque utilisateur garde sa liste d'entrées dans l'ordre d'ajout
+# (seule trace de leur chronologie) : le rang `seq` des entrées la reconstitue.
+
+def _ledger_from_json(data):
+    ledger = {}
+    for uid, entries in data.items():
+        debts = ledger[uid] = {}
+        for seq, e in enumerate(entries):
+            entry = LedgerEntry.from_json(e)
+            entry.seq = seq
+            debts.setdefault(entry.code, deque()).append(entry)
+    return ledger
+
+
+def _next_seq(debts):
+    """Rang de la prochaine entrée d'un utilisateur : après la plus récente de chaque file"""
+    return max((queue[-1].seq for queue in debts.values() if queue), default=-1) + 1
+
+
+def _flatten(debts):
+    """Entrées d'un utilisateur, de la plus ancienne à la plus récente (tous items confondus)"""
+    if len(debts) <= 1:
+        return [entry for queue in debts.values() for entry in queue]
+    return list(heapq.merge(*debts.values(), key=attrgetter("seq")))
+
+
+def _count(debts):
+    return sum(len(queue) for queue in debts.values())
+
+
+def _pending_from_json(data):
+    return {pid: Proposal.from_json(p) for pid, p in data.items()}
+
+
+def _copy_ledger(ledger):
+    return {uid: [e.to_json() for e in _flatten(debts)] for uid, debts in ledger.items()}
+
+
+async def _copy_ledger_chunked(ledger):
+    """Copie le ledger par morceaux en rendant la main à la boucle entre deux morceaux
+
+    Chaque utilisateur est copié d'un bloc ; une mutation faite pendant la
+    copie remet le store en dirty et sera reprise à l'écriture suivante.
+    """
+    copy = {}
+    copied = 0
+    for uid, debts in list(ledger.items()):
+        copy[uid] = [e.to_json() for e in _flatten(debts)]
+        copied += len(copy[uid])
+        if copied >= COPY_CHUNK:
+            copied = 0
+            await asyncio.sleep(0)
+    return copy
+
+
+def _compute_totals(ledger):
+    """Recalcule depuis zéro les totaux par utilisateur/item et le total général"""
+    totals = {}
+    grand_total = {}
+    for uid, debts in ledger.items():
+        user_totals = totals.setdefault(uid, {})
+        for queue in debts.values():
+            for entry in queue:
+                item = entry.item
+                user_totals[item] = user_totals.get(item, 0) + entry.amount
+                grand_total[item] = grand_total.get(item, 0) + entry.amount
+    return totals, grand_total
+
+
+def _copy_totals(totals, grand_total, entry_count):
+    return {
+        "entries": entry_count,
+        "users": {uid: dict(items) for uid, items in totals.items()},
+        "grand_total": dict(grand_total),
+    }
+
+
+def _copy_pending(pending):
+    return {pid: p.to_json() for pid, p in pending.items()}
+
+
+# ============================================================
+# 🔵 STORE EN MÉMOIRE (ledger + pending)
+# ============================================================
+class JsonStore:
+    """Garde ledger et pending en mémoire et les écrit sur disque en différé"""
+
+    def __init__(self, ledger_file=LEDGER_FILE, pending_file=PENDING_FILE, totals_file=TOTALS_FILE,
+                 flush_interval=WRITE_BEHIND_INTERVAL):
+        self.ledger_file = ledger_file
+        self.pending_file = pending_file
+        self.totals_file = totals_file
+        self.flush_interval = flush_interval
+        self.ledger = {}
+        self.pending = {}
+        # Agrégats maintenus à chaque mutation : user_id → {item: quantité}, item → quantité
+        self.totals = {}
+        self.grand_total = {}
+        self._entry_count = 0
+        self.version = _next_version()  # change à chaque modification du ledger (cache des dashboards)
+        self._by_message = {}  # message_id → proposal_id
+        self._by_target = {}   # (victime, item) → proposal_id de la dernière proposition individuelle
+        self._ledger_dirty = False
+        self._pending_dirty = False
+        self._flush_task = None
+        self._flush_lock = asyncio.Lock()
+
+    # ---------- cycle de vie ----------
+
+    def load(self):
+        self.ledger = _ledger_from_json(_load_json(self.ledger_file))
+        self.pending = _pending_from_json(_load_json(self.pending_file))
+        self._index_pending()
+        self._restore_totals(_load_json(self.totals_file), _file_stamp(self.ledger_file))
+
+    def read_pending(self):
+        """Propositions en attente lues sur disque, sans le ledger (store non démarré)"""
+        if os.path.exists(self.pending_file):
+            self.pending = _pending_from_json(_load_json(self.pending_file))
+        return list(self.pending_items())
+
+    def _restore_totals(self, saved, ledger_stamp=None):
+        """Reprend les agrégats sauvegardés, ou les recalcule s'ils ont dérivé du ledger
+
+        Vérification en O(utilisateurs) : mêmes utilisateurs et même nombre
+        d'entrées que le ledger chargé. Ledger et totaux étant deux fichiers,
+        totals.json garde aussi l'empreinte du ledger.json dont il est issu :
+        un arrêt entre les deux écritures (un acquittement partiel ne change
+        ni le nombre d'entrées ni les utilisateurs) force le recalcul.
+        """
+        self.totals = saved.get("users", {})
+        self.grand_total = saved.get("grand_total", {})
+        self._entry_count = saved.get("entries", 0)
+        entry_count = sum(_count(debts) for debts in self.ledger.values())
+        stale = ledger_stamp is not None and saved and saved.get("ledger_stamp") != ledger_stamp
+        if stale or self._entry_count != entry_count or self.totals.keys() != self.ledger.keys():
+            log.warning("Totals out of sync with the ledger, rebuilding them")
+            self.rebuild_totals()
+
+    def rebuild_totals(self):
+        """Recalcule tous les agrégats depuis le ledger (à la demande)"""
+        self.totals, self.grand_total = _compute_totals(self.ledger)
+        self._entry_count = sum(_count(debts) for debts in self.ledger.values())
+        self._ledger_changed()
+
+    def _ledger_changed(self):
+        self._ledger_dirty = True
+        self.version = _next_version()
+
+    def _index_pending(self):
+        self._by_message = {
+            p.message_id: pid for pid, p in self.pending.items() if p.message_id
+        }
+        self._by_target = {
+            (p.user_id, p.item): pid for pid, p in self.pending.items() if not p.user_ids
+        }
+
+    async def start(self):
+        """Charge les fichiers (dans un thread) et lance la boucle d'écriture différée
+
+        Les serveurs sont ouverts bot connecté : le parsing d'un gros ledger
+        ne doit pas bloquer la boucle, donc le heartbeat de tous les shards.
+        """
+        await asyncio.to_thread(self.load)
+        self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def close(self):
+        """Arrête la boucle et écrit ce qui reste en attente"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                # shield : un close() pendant l'écriture attend qu'elle se termine
+                await asyncio.shield(self.flush())
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception("Store flush failed")
+
+    async def flush(self):
+        """Écrit sur disque, dans un thread, les fichiers modifiés depuis la dernière écriture
+
+        Toutes les modifications faites depuis la dernière écriture sont
+        regroupées en une seule écriture par fichier. Sur la boucle on ne
+        fait qu'une copie de l'état, la sérialisation se fait hors boucle.
+        """
+        async with self._flush_lock:
+            if self._ledger_dirty:
+                self._ledger_dirty = False
+                version = self.version
+                totals = _copy_totals(self.totals, self.grand_total, self._entry_count)
+                ledger = await _copy_ledger_chunked(self.ledger)
+                # Une mutation pendant la copie : les totaux ne décrivent pas ce
+                # ledger-là, pas d'empreinte (recalcul si l'on s'arrête avant la reprise)
+                consistent = self.version == version
+                await self._write(self.ledger_file, ledger, "_ledger_dirty")
+                if consistent:
+                    totals["ledger_stamp"] = _file_stamp(self.ledger_file)
+                await self._write(self.totals_file, totals, "_ledger_dirty")
+            if self._pending_dirty:
+                self._pending_dirty = False
+                await self._write(self.pending_file, _copy_pending(self.pending), "_pending_dirty")
+
+    async def _write(self, path, data, dirty_flag):
+        try:
+            await asyncio.to_thread(_save_json, path, data)
+        except Exception:
+            setattr(self, dirty_flag, True)  # on réessaiera au prochain passage
+            raise
+
+    # ---------- ledger ----------
+
+    def ledger_items(self):
+        return ((uid, _flatten(debts)) for uid, debts in self.ledger.items())
+
+    def ledger_user_ids(self):
+        """IDs des utilisateurs présents dans le ledger, sans copier leurs entrées"""
+        return list(self.ledger)
+
+    def user_entries(self, user_id):
+        return _flatten(self.ledger.get(str(user_id), {}))
+
+    def user_totals(self):
+        """(user_id, {item: quantité}) pour chaque utilisateur, sans parcourir les entrées"""
+        return self.totals.items()
+
+    def totals_for(self, user_id):
+        return self.totals.get(str(user_id), {})
+
+    def grand_totals(self):
+        return self.grand_total
+
+    def _add_to_totals(self, uid, item, delta):
+        user_totals = self.totals.setdefault(uid, {})
+        user_totals[item] = user_totals.get(item, 0) + delta
+        self.grand_total[item] = self.grand_total.get(item, 0) + delta
+        if not user_totals[item]:
+            del user_totals[item]
+        if not self.grand_total[item]:
+            del self.grand_total[item]
+
+    def add_entry(self, user_id, entry):
+        """Ajoute une tournée validée au grand livre"""
+        self._add_entry(user_id, entry)
+        self._ledger_changed()
+
+    def add_entries(self, lines):
+        """Ajoute plusieurs tournées (user_id, entrée) en une seule mutation
+
+        Même principe que settle_many : le ledger n'est marqué qu'une fois.
+        Chaque ligne a sa propre entrée (settle les décrémente sur place).
+        """
+        for user_id, entry in lines:
+            self._add_entry(user_id, entry)
+        self._ledger_changed()
+
+    def _add_entry(self, user_id, entry):
+        """Corps de add_entry(), sans marquer le ledger comme modifié"""
+        uid = str(user_id)
+        debts = self.ledger.setdefault(uid, {})
+        entry.seq = _next_seq(debts)
+        debts.setdefault(entry.code, deque()).append(entry)
+        self._add_to_totals(uid, entry.item, entry.amount)
+        self._entry_count += 1
+
+    def settle(self, user_id, item, amount):
+        """Acquitte `amount` unités de `item`, des plus anciennes aux plus récentes
+
+        Retourne la quantité réellement acquittée (bornée par la dette restante).
+        Seules les entrées consommées sont touchées : O(entrées soldées).
+        Rien à acquitter : le ledger n'est pas marqué (ni écriture, ni cache invalidé).
+        """
+        settled = self._settle(user_id, item, amount)
+        if settled:
+            self._ledger_changed()
+        return settled
+
+    def settle_many(self, lines):
+        """Acquitte plusieurs lignes (user_id, item, quantité) en une seule mutation
+
+        Toutes les lignes sont appliquées sans rendre la main à la boucle,
+        puis le ledger est marqué une seule fois : une seule écriture.
+        Retourne les quantités réellement acquittées, ligne par ligne.
+        """
+        settled = [self._settle(user_id, item, amount) for user_id, item, amount in lines]
+        if any(settled):
+            self._ledger_changed()
+        return settled
+
+    def _settle(self, user_id, item, amount):
+        """Corps de settle(), sans marquer le ledger comme modifié"""
+        uid = str(user_id)
+        code = item_code(item)
+        remaining = amount
+        debts = self.ledger.get(uid, {})
+        queue = debts.get(code, ())
+
+        # Décrémentation des dettes existantes, en tête de file
+        while queue and remaining > 0:
+            entry = queue[0]
+            if entry.amount <= remaining:
+                remaining -= entry.amount
+                queue.popleft()
+                self._entry_count -= 1
+            else:
+                entry.amount -= remaining
+                remaining = 0
+        if amount > remaining:
+            self._add_to_totals(uid, item, remaining - amount)
+
+        # Suppression de la file vide, puis de l'utilisateur s'il n'a plus aucune dette
+        if code in debts and not queue:
+            del debts[code]
+        if uid in self.ledger and not debts:
+            del self.ledger[uid]
+            self.totals.pop(uid, None)
+        return amount - remaining
+
+    # ---------- pending ----------
+
+    def pending_items(self):
+        return self.pending.items()
+
+    def get_proposal(self, proposal_id):
+        return self.pending.get(proposal_id)
+
+    def add_proposal(self, proposal_id, entry):
+        self.pending[proposal_id] = entry
+        if entry.message_id:
+            self._by_message[entry.message_id] = proposal_id
+        if not entry.user_ids:
+            self._by_target[(entry.user_id, entry.item)] = proposal_id
+        self._pending_dirty = True
+
+    def update_proposal(self, proposal_id, **changes):
+        self.pending[proposal_id].update(**changes)
+        if changes.get("message_id"):
+            self._by_message[changes["message_id"]] = proposal_id
+        self._pending_dirty = True
+
+    def add_vote(self, proposal_id, user_id):
+        """Ajoute un vote, retourne False si l'utilisateur a déjà voté"""
+        votes = self.pending[proposal_id].votes
+        if user_id in votes:
+            return False
+        votes.add(user_id)
+        self._pending_dirty = True
+        return True
+
+    def remove_proposal(self, proposal_id, status=None):
+        """Retire une proposition (status : "validated" ou "expired")"""
+        entry = self.pending.pop(proposal_id, None)
+        if entry and entry.message_id:
+            self._by_message.pop(entry.message_id, None)
+        if entry and self._by_target.get((entry.user_id, entry.item)) == proposal_id:
+            del self._by_target[(entry.user_id, entry.item)]
+        self._pending_dirty = True
+
+    def find_proposal_by_message(self, message_id):
+        """Retourne l'ID de la proposition liée à ce message, ou None (sans I/O)"""
+        return self._by_message.get(message_id)
+
+    def find_proposal_for(self, user_id, item):
+        """Dernière proposition individuelle ouverte pour (victime, item), ou None (sans I/O)"""
+        return self._by_target.get((user_id, item))
+
+
+
+# ============================================================
+# 🔵 STORE JOURNALISÉ (append-only + snapshot)
+# ============================================================
+class JournalStore(JsonStore):
+    """Écrit chaque mutation dans un journal, replié périodiquement dans un snapshot
+
+    Le snapshot contient ledger, pending et le numéro du dernier
+    enregistrement qu'il inclut : au démarrage on le charge puis on
+    rejoue uniquement la fin du journal. Pendant une compaction le
+    journal courant est mis de côté (journal.jsonl.1) et les nouvelles
+    mutations partent dans un journal neuf.
+    """
+
+    # Enregistrements dont les arguments sont relus en objets du modèle
+    DECODERS = {
+        "entry_added": lambda args: {**args, "entry": LedgerEntry.from_json(args["entry"])},
+        "entries_added": lambda args: {
+            "lines": [(user_id, LedgerEntry.from_json(entry)) for user_id, entry in args["lines"]],
+        },
+        "proposal_created": lambda args: {**args, "entry": Proposal.from_json(args["entry"])},
+    }
+
+    # Enregistrements qui ne touchent que pending (relus par read_pending)
+    PENDING_OPERATIONS = ("proposal_created", "proposal_updated", "vote_added", "proposal_removed")
+
+    # Nom de l'enregistrement → méthode de JsonStore qui le rejoue
+    OPERATIONS = {
+        "proposal_created": "add_proposal",
+        "proposal_updated": "update_proposal",
+        "vote_added": "add_vote",
+        "proposal_removed": "remove_proposal",
+        "entry_added": "add_entry",
+        "entries_added": "add_entries",
+        "debt_settled": "settle",
+        "debts_settled": "settle_many",
+    }
+
+    def __init__(self, snapshot_file=SNAPSHOT_FILE, journal_file=JOURNAL_FILE,
+                 compact_interval=JOURNAL_COMPACT_INTERVAL, **kwargs):
+        super().__init__(**kwargs)
+        self.snapshot_file = snapshot_file
+        self.journal_file = journal_file
+        self.compact_interval = compact_interval
+        self._seq = 0
+        self._journal = None
+
+    # ---------- cycle de vie ----------
+
+    def load(self):
+        if os.path.exists(self.snapshot_file):
+            with open(self.snapshot_file, "r") as f:
+                snapshot = _read_json(f)
+            self.ledger = _ledger_from_json(snapshot["ledger"])
+            self.pending = _pending_from_json(snapshot["pending"])
+            self._seq = snapshot["seq"]
+            self._index_pending()
+            self._restore_totals(snapshot.get("totals", {}))
+        else:
+            # Premier démarrage en mode journal : on part des fichiers JSON existants
+            super().load()
+        old_segment = self.journal_file + ".1"
+        self._replay(old_segment)
+        self._replay(self.journal_file)
+
+        if os.path.exists(old_segment):
+            # Compaction interrompue : on la termine avant d'accepter de nouvelles écritures
+            _save_json(self.snapshot_file, {
+                "seq": self._seq,
+                "ledger": _copy_ledger(self.ledger),
+                "pending": _copy_pending(self.pending),
+                "totals": _copy_totals(self.totals, self.grand_total, self._entry_count),
+            })
+            open(self.journal_file, "w").close()
+            os.remove(old_segment)
+        self._journal = open(self.journal_file, "a")
+
+    def read_pending(self):
+        """Propositions en attente du snapshot et du journal, sans construire le ledger
+
+        Le snapshot est tout de même lu en entier (un seul fichier) ; seules
+        les mutations de pending sont rejouées et le journal n'est pas modifié.
+        """
+        if os.path.exists(self.snapshot_file):
+            with open(self.snapshot_file, "r") as f:
+                snapshot = _read_json(f)
+            self.pending = _pending_from_json(snapshot["pending"])
+            self._seq = snapshot["seq"]
+        else:
+            super().read_pending()
+        self._replay(self.journal_file + ".1", self.PENDING_OPERATIONS)
+        self._replay(self.journal_file, self.PENDING_OPERATIONS)
+        return list(self.pending_items())
+
+    def _replay(self, path, operations=None):
+        """Rejoue un segment du journal ; avec `operations`, seulement celles-là et en lecture seule"""
+        if not os.path.exists(path):
+            return
+        replayed = 0
+        valid_size = 0
+        with open(path, "rb" if operations else "rb+") as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("missing newline")
+                    record = json.loads(line)
+                except ValueError:
+                    if operations:
+                        break  # la fin tronquée sera retirée au chargement complet
+                    # Dernière ligne tronquée par un arrêt brutal : on la retire
+                    log.warning("Dropping corrupted journal tail: %r", line[:80])
+                    f.truncate(valid_size)
+                    break
+                valid_size += len(line)
+                if record["seq"] <= self._seq:
+                    continue  # déjà inclus dans le snapshot
+                if operations and record["op"] not in operations:
+                    continue
+                args = record["args"]
+                if record["op"] in self.DECODERS:
+                    args = self.DECODERS[record["op"]](args)
+                getattr(JsonStore, self.OPERATIONS[record["op"]])(self, **args)
+                self._seq = record["seq"]
+                replayed += 1
+        log.debug("Replayed %d journal record(s) from %s", replayed, path)
+
+    async def close(self):
+        await super().close()
+        if self._journal:
+            await self.compact()
+            self._journal.close()
+            self._journal = None
+
+    async def _flush_loop(self):
+        elapsed = 0
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            elapsed += self.flush_interval
+            try:
+                await asyncio.shield(self.flush())
+                if elapsed >= self.compact_interval:
+                    elapsed = 0
+                    await asyncio.shield(self.compact())
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception("Journal flush failed")
+
+    async def flush(self):
+        """Force le journal sur disque (fsync dans un thread)"""
+        async with self._flush_lock:
+            if self._journal:
+                self._journal.flush()
+                await asyncio.to_thread(os.fsync, self._journal.fileno())
+
+    async def compact(self):
+        """Replie le journal dans un nouveau snapshot puis le supprime"""
+        async with self._flush_lock:
+            old_segment = self.journal_file + ".1"
+            self._journal.close()
+            os.replace(self.journal_file, old_segment)
+            self._journal = open(self.journal_file, "a")
+
+            # Copie du ledger par morceaux ; si une mutation est passée entre deux
+            # morceaux, la copie mélange deux états et le journal la rejouerait
+            # une seconde fois : on la refait alors d'un bloc
+            version = self.version
+            ledger = await _copy_ledger_chunked(self.ledger)
+            if self.version != version:
+                ledger = _copy_ledger(self.ledger)
+            snapshot = {
+                "seq": self._seq,
+                "ledger": ledger,
+                "pending": _copy_pending(self.pending),
+                "totals": _copy_totals(self.totals, self.grand_total, self._entry_count),
+            }
+            try:
+                await asyncio.to_thread(_save_json, self.snapshot_file, snapshot)
+            except Exception:
+                # Snapshot raté : on remet l'ancien segment devant le journal courant
+                self._journal.close()
+                with open(old_segment, "a") as old, open(self.journal_file, "r") as new:
+                    old.write(new.read())
+                os.replace(old_segment, self.journal_file)
+                self._journal = open(self.journal_file, "a")
+                raise
+            os.remove(old_segment)
+
+    def _record(self, op, **args):
+        self._seq += 1
+        self._journal.write(json.dumps({"seq": self._seq, "op": op, "args": args}) + "\n")
+        self._journal.flush()
+
+    # ---------- mutations journalisées ----------
+
+    def add_entry(self, user_id, entry):
+        super().add_entry(user_id, entry)
+        self._record("entry_added", user_id=user_id, entry=entry.to_json())
+
+    def add_entries(self, lines):
+        # Un seul enregistrement pour tout le groupe, comme settle_many
+        super().add_entries(lines)
+        self._record("entries_added", lines=[[user_id, entry.to_json()] for user_id, entry in lines])
+
+    def settle(self, user_id, item, amount):
+        settled = super().settle(user_id, item, amount)
+        if settled:
+            self._record("debt_settled", user_id=user_id, item=item, amount=amount)
+        return settled
+
+    def settle_many(self, lines):
+        # Un seul enregistrement : une fin de journal tronquée perd tout le lot, jamais une partie
+        settled = super().settle_many(lines)
+        if any(settled):
+            self._record("debts_settled", lines=[list(line) for line in lines])
+        return settled
+
+    def add_proposal(self, proposal_id, entry):
+        super().add_proposal(proposal_id, entry)
+        self._record("proposal_created", proposal_id=proposal_id, entry=entry.to_json())
+
+    def update_proposal(self, proposal_id, **changes):
+        super().update_proposal(proposal_id, **changes)
+        self._record("proposal_updated", proposal_id=proposal_id, **changes)
+
+    def add_vote(self, proposal_id, user_id):
+        added = super().add_vote(proposal_id, user_id)
+        if added:
+            self._record("vote_added", proposal_id=proposal_id, user_id=user_id)
+        return added
+
+    def remove_proposal(self, proposal_id, status=None):
+        super().remove_proposal(proposal_id, status)
+        self._record("proposal_removed", proposal_id=proposal_id, status=status)
+
+
+def create_store(directory=None, backend=None):
+    """Instancie le store choisi par STORAGE_BACKEND, avec ses fichiers dans `directory`"""
+    backend = backend or STORAGE_BACKEND
+    path = partial(os.path.join, directory) if directory else str
+    if backend == "sqlite":
+        from sqlite_store import SQLITE_FILE, SQLiteStore
+        return SQLiteStore(path(os.path.basename(SQLITE_FILE)))
+    files = {"ledger_file": path(LEDGER_FILE), "pending_file": path(PENDING_FILE), "totals_file": path(TOTALS_FILE)}
+    if backend == "journal":
+        return JournalStore(path(SNAPSHOT_FILE), path(JOURNAL_FILE), **files)
+    return JsonStore(**files)
+
+
+# ============================================================
+# 🔵 UN STORE PAR SERVEUR
+# ============================================================
+class GuildStores:
+    """Les données de chaque serveur dans leur propre store (DATA_DIR/<guild_id>/)
+
+    store = await bot.stores.get(interaction.guild_id)
+
+    Un store est ouvert à la première opération sur son serveur : les
+    serveurs sans activité ne sont jamais chargés, et chaque écriture ne
+    touche que les fichiers du serveur concerné. Les appels simultanés sur
+    un serveur pas encore ouvert partagent un seul chargement. Après
+    `idle_timeout` secondes sans get(), un serveur sans proposition en
+    attente est fermé (délai bien plus long que celui des vues, 90–120 s).
+    """
+
+    def __init__(self, data_dir=DATA_DIR, factory=create_store, idle_timeout=GUILD_IDLE_TIMEOUT):
+        self.data_dir = data_dir
+        self.factory = factory  # dossier du serveur → store pas encore démarré
+        self.idle_timeout = idle_timeout
+        self._stores = {}       # guild_id → store ouvert
+        self._opening = {}      # guild_id → tâche de chargement en cours
+        self._closing = {}      # guild_id → tâche de fermeture (éviction) en cours
+        self._last_used = {}    # guild_id → time.monotonic() du dernier get()
+        self._evict_task = None
+
+    def __len__(self):
+        return len(self._stores)
+
+    def loaded(self):
+        """(guild_id, store) des serveurs déjà ouverts"""
+        return self._stores.items()
+
+    def get_loaded(self, guild_id):
+        """Store du serveur s'il est ouvert, None sinon (sans I/O)"""
+        store = self._stores.get(guild_id)
+        if store is not None:
+            self._last_used[guild_id] = time.monotonic()
+        return store
+
+    def known_guilds(self):
+        """Serveurs déjà ouverts ou qui ont des données sur disque
+
+        Le serveur LEGACY_GUILD_ID en fait partie tant que les fichiers
+        d'avant le partitionnement n'ont pas été déplacés dans son dossier.
+        """
+        guild_ids = set(self._stores)
+        if self.data_dir and os.path.isdir(self.data_dir):
+            guild_ids.update(int(name) for name in os.listdir(self.data_dir) if name.isdigit())
+        legacy_guild_id = self.legacy_guild()
+        if legacy_guild_id is not None:
+            guild_ids.add(legacy_guild_id)
+        return sorted(guild_ids)
+
+    def legacy_guild(self):
+        """Serveur qui doit reprendre les fichiers d'avant le partitionnement, None s'il n'y en a pas
+
+        Lève RuntimeError si ces fichiers contiennent des données sans que
+        LEGACY_GUILD_ID dise à quel serveur elles appartiennent : démarrer
+        quand même les laisserait de côté, propositions en attente comprises.
+        """
+        if not self.data_dir or not _legacy_files():
+            return None
+        if not LEGACY_GUILD_ID:
+            raise RuntimeError(
+                f"Legacy data files found ({', '.join(_legacy_files())}): "
+                "set LEGACY_GUILD_ID to the guild they belong to"
+            )
+        return int(LEGACY_GUILD_ID)
+
+    def adopt(self, guild_id, store):
+        """Enregistre un store déjà démarré pour ce serveur"""
+        self._stores[guild_id] = store
+        self._last_used[guild_id] = time.monotonic()
+
+    async def read_pending(self, guild_id):
+        """Propositions en attente d'un serveur, sans charger son ledger s'il n'est pas ouvert"""
+        if guild_id in self._stores or guild_id in self._opening or guild_id in self._closing:
+            return list((await self.get(guild_id)).pending_items())
+        if str(guild_id) == LEGACY_GUILD_ID and _legacy_files():
+            # Fichiers d'avant le partitionnement : l'ouverture les déplace d'abord
+            return list((await self.get(guild_id)).pending_items())
+        reader = self.factory(os.path.join(self.data_dir, str(guild_id)))
+        return await asyncio.to_thread(reader.read_pending)
+
+    async def get(self, guild_id):
+        store = self._stores.get(guild_id)
+        if store is not None:
+            self._last_used[guild_id] = time.monotonic()
+            return store
+        opening = self._opening.get(guild_id)
+        if opening is None:
+            opening = self._opening[guild_id] = asyncio.create_task(self._open(guild_id))
+            # Un échec n'est pas retenu : l'appel suivant retente le chargement
+            opening.add_done_callback(lambda _: self._opening.pop(guild_id, None))
+        # shield : un appelant annulé n'interrompt pas le chargement des autres
+        return await asyncio.shield(opening)
+
+    async def _open(self, guild_id):
+        closing = self._closing.get(guild_id)
+        if closing is not None:
+            # Fermé pour inactivité à l'instant : ses dernières écritures d'abord
+            await asyncio.wait([closing])
+        directory = os.path.join(self.data_dir, str(guild_id))
+        os.makedirs(directory, exist_ok=True)
+        if str(guild_id) == LEGACY_GUILD_ID:
+            _adopt_legacy_files(directory)
+        store = self.factory(directory)
+        await store.start()
+        self._stores[guild_id] = store
+        self._last_used[guild_id] = time.monotonic()
+        log.info("Opened storage of guild %s", guild_id)
+        return store
+
+    async def start(self):
+        """Lance la boucle qui ferme les serveurs inactifs"""
+        self._evict_task = asyncio.create_task(self._evict_loop())
+
+    async def _evict_loop(self):
+        while True:
+            await asyncio.sleep(min(GUILD_EVICT_INTERVAL, self.idle_timeout))
+            try:
+                await self.evict_idle()
+            except Exception:
+                log.exception("Guild storage eviction failed")
+
+    async def evict_idle(self):
+        """Ferme les serveurs restés sans get() depuis idle_timeout secondes
+
+        Un serveur qui a des propositions en attente reste ouvert : ses
+        votes (on_raw_reaction_add) et ses échéances ne passent que par
+        un store déjà chargé.
+        """
+        now = time.monotonic()
+        for guild_id, store in list(self._stores.items()):
+            if now - self._last_used.get(guild_id, now) < self.idle_timeout or store.pending_items():
+                continue
+            del self._stores[guild_id]
+            self._last_used.pop(guild_id, None)
+            closing = self._closing[guild_id] = asyncio.create_task(store.close())
+            closing.add_done_callback(lambda _, guild_id=guild_id: self._closing.pop(guild_id, None))
+            await asyncio.shield(closing)
+            log.info("Closed idle storage of guild %s", guild_id)
+
+    async def close(self):
+        """Ferme tous les stores ouverts (écrit ce qui reste en attente)"""
+        if self._evict_task:
+            self._evict_task.cancel()
+            try:
+                await self._evict_task
+            except asyncio.CancelledError:
+                pass
+            self._evict_task = None
+        if self._closing:
+            await asyncio.wait(list(self._closing.values()))
+        stores, self._stores = list(self._stores.values()), {}
+        for store in stores:
+            await store.close()
+
+
+def _legacy_names():
+    from sqlite_store import SQLITE_FILE
+    return (LEDGER_FILE, PENDING_FILE, TOTALS_FILE, SNAPSHOT_FILE, JOURNAL_FILE, JOURNAL_FILE + ".1",
+            SQLITE_FILE, SQLITE_FILE + "-wal", SQLITE_FILE + "-shm")
+
+
+def _legacy_files():
+    """Fichiers globaux d'avant le partitionnement qui contiennent des données
+
+    Un ledger.json ou pending.json réduit à {} (celui du dépôt) n'en contient pas.
+    """
+    found = []
+    for name in _legacy_names():
+        if not os.path.exists(name):
+            continue
+        if name in (LEDGER_FILE, PENDING_FILE, TOTALS_FILE) and not _load_json(name):
+            continue
+        found.append(name)
+    return found
+
+
+def _adopt_legacy_files(directory):
+    """Déplace les fichiers globaux d'avant le partitionnement dans un dossier de serveur vide"""
+    if os.listdir(directory):
+        if _legacy_files():
+            log.error("Legacy data files left in place: %s already has data", directory)
+        return
+    for name in _legacy_names():
+        if os.path.exists(name):
+            os.replace(name, os.path.join(directory, os.path.basename(name)))
+            log.warning("Moved legacy %s into %s", name, directory)
@@ -0,0 +1,128 @@
+# user_cache.py
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict, namedtuple
+
+import discord
+
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "2048"))  # utilisateurs gardés en cache
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "600"))  # secondes avant de revalider un nom
+PREFETCH_CONCURRENCY = 8  # fetch_user simultanés max pendant un préchargement
+
+log = logging.getLogger(__name__)
+
+ResolvedUser = namedtuple("ResolvedUser", ["id", "display_name", "mention"])
+
+
+def _unknown(user_id):
+    return ResolvedUser(user_id, "Inconnu", f"<@{user_id}>")
+
+
+# ============================================================
+# 🔵 RÉSOLUTION DES UTILISATEURS (LRU + TTL)
+# ============================================================
+class UserResolver:
+    """Résout des IDs en noms affichés, partagé par tous les cogs
+
+    Ordre de recherche : cache LRU → guild.get_member / bot.get_user
+    (caches du gateway, sans REST) → bot.fetch_user. Les requêtes
+    simultanées pour un même ID partagent un seul fetch_user.
+    """
+
+    def __init__(self, bot, max_size=USER_CACHE_SIZE, ttl=USER_CACHE_TTL):
+        self.bot = bot
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.fetches = 0
+        self._cache = OrderedDict()  # (guild_id, user_id) → (expire_ts, ResolvedUser)
+        self._in_flight = {}         # (guild_id, user_id) → Future
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "fetches": self.fetches, "size": len(self._cache)}
+
+    def _get_cached(self, key):
+        cached = self._cache.get(key)
+        if cached is None:
+            return None
+        expire_ts, resolved = cached
+        if expire_ts < time.monotonic():
+            del self._cache[key]
+            return None
+        self._cache.move_to_end(key)
+        return resolved
+
+    def _put(self, key, resolved):
+        self._cache[key] = (time.monotonic() + self.ttl, resolved)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+
+    def lookup(self, user_id, guild=None):
+        """Version sans REST : cache puis caches du gateway, None si introuvable"""
+        user_id = int(user_id)
+        key = (guild.id if guild else None, user_id)
+        resolved = self._get_cached(key)
+        if resolved is not None:
+            self.hits += 1
+            return resolved
+        self.misses += 1
+
+        user = guild.get_member(user_id) if guild else None
+        if user is None:
+            user = self.bot.get_user(user_id)
+        if user is None:
+            return None
+        resolved = ResolvedUser(user_id, user.display_name, user.mention)
+        self._put(key, resolved)
+        return resolved
+
+    async def resolve(self, user_id, guild=None):
+        """Comme lookup, avec repli sur fetch_user (un seul appel par ID en vol)"""
+        resolved = self.lookup(user_id, guild)
+        if resolved is not None:
+            return resolved
+
+        user_id = int(user_id)
+        key = (guild.id if guild else None, user_id)
+        future = self._in_flight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._fetch(key, user_id))
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        return await asyncio.shield(future)
+
+    async def prefetch(self, user_ids, guild=None, concurrency=PREFETCH_CONCURRENCY):
+        """Résout un lot d'IDs en parallèle (au plus `concurrency` à la fois)
+
+        Retourne un dict user_id → ResolvedUser ; un ID en échec est
+        remplacé par "Inconnu" pour que l'affichage puisse se faire.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def resolve_one(user_id):
+            async with semaphore:
+                try:
+                    return await self.resolve(user_id, guild)
+                except discord.HTTPException as e:
+                    log.error("Could not resolve user %s: %s", user_id, e)
+                    return _unknown(user_id)
+
+        user_ids = list(dict.fromkeys(int(uid) for uid in user_ids))
+        resolved = await asyncio.gather(*(resolve_one(uid) for uid in user_ids))
+        return dict(zip(user_ids, resolved))
+
+    async def _fetch(self, key, user_id):
+        self.fetches += 1
+        try:
+            user = await self.bot.fetch_user(user_id)
+        except discord.NotFound:
+            resolved = _unknown(user_id)
+        else:
+            resolved = ResolvedUser(user_id, user.display_name, user.mention)
+        self._put(key, resolved)
+        return resolved